@@ -5,12 +5,14 @@ Módulo de Alertas Inteligentes
 Sistema de notificações e alertas baseados em análise de dados
 """
 
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import sqlite3
 import json
+import os
+import copy
+import tempfile
 from pathlib import Path
 import tkinter as tk
 from tkinter import messagebox
@@ -18,9 +20,74 @@ import customtkinter as ctk
 from main import DatabaseManager
 from analise_risco import RiskAnalyzer
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import time
+import functools
+from collections import deque
+from operator import itemgetter
+import bisect
+import itertools
 import warnings
-warnings.filterwarnings('ignore')
+
+# Serialização JSON mais rápida (opcional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Sequência de perdas, ROI de 30 dias e performance diária numa única ida à base de dados.
+# Colunas: (etiqueta, data, apostas/sequência, ganhas, total_apostado, lucro)
+_SUMMARY_QUERY = """
+    WITH resolvidas AS (
+        SELECT data_hora, resultado, valor_apostado, lucro_prejuizo
+        FROM apostas 
+        WHERE resultado IN ('Ganha', 'Perdida')
+    ),
+    recentes AS (
+        SELECT resultado, ROW_NUMBER() OVER (ORDER BY data_hora DESC) AS rn
+        FROM resolvidas 
+        ORDER BY data_hora DESC 
+        LIMIT 20
+    )
+    SELECT 'streak', NULL,
+           COALESCE(MIN(CASE WHEN resultado = 'Ganha' THEN rn END) - 1, COUNT(*)),
+           NULL, NULL, NULL
+    FROM recentes
+    UNION ALL
+    SELECT 'roi30', NULL, NULL, NULL, SUM(valor_apostado), SUM(lucro_prejuizo)
+    FROM resolvidas 
+    WHERE date(data_hora, 'localtime') >= date('now', '-30 days')
+    UNION ALL
+    SELECT 'anomaly', date(data_hora, 'localtime'), COUNT(*),
+           SUM(CASE WHEN resultado = 'Ganha' THEN 1 ELSE 0 END),
+           SUM(valor_apostado), SUM(lucro_prejuizo)
+    FROM resolvidas 
+    WHERE date(data_hora, 'localtime') >= date('now', '-14 days')
+    GROUP BY date(data_hora, 'localtime')
+"""
+
+# Histórico recente das equipas de uma aposta (executado a cada aposta introduzida)
+_ESTIMATE_QUERY = """
+    SELECT resultado 
+    FROM apostas 
+    WHERE (equipa_casa = ? OR equipa_fora = ? OR equipa_casa = ? OR equipa_fora = ?)
+    AND resultado IN ('Ganha', 'Perdida')
+    ORDER BY data_hora DESC 
+    LIMIT 20
+"""
+
+# Configuração guardada, partilhada entre instâncias e revalidada pelo mtime do ficheiro
+_CONFIG_PATH = Path('config') / 'alerts_config.json'
+_CONFIG_CACHE = {'mtime': None, 'data': None}
+
+# Ordem de apresentação dos alertas por severidade
+_SEVERITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+
+@functools.lru_cache(maxsize=1024)
+def _format_history_time(timestamp: datetime) -> str:
+    """Formatar a hora de uma linha do histórico (alertas do mesmo lote partilham o timestamp)"""
+    return timestamp.strftime("%d/%m %H:%M")
 
 class AlertSystem:
     """Sistema de alertas inteligentes"""
@@ -29,9 +96,89 @@ class AlertSystem:
         self.db = db
         self.risk_analyzer = RiskAnalyzer(db)
         self.alerts_config = self.load_alerts_config()
-        self.active_alerts = []
-        self.alert_history = []
-        
+        self.active_alerts: Dict[int, Dict] = {}
+        self._active_expiry = deque()  # (timestamp, id) por ordem de inserção
+        self._active_by_severity: List[Tuple[int, int]] = []  # (severidade, id) sempre ordenado
+        self.alert_history = deque(maxlen=10000)  # Limitado para monitorização prolongada
+        self._next_id = 1
+        # Estado dos alertas partilhado entre a thread Tk, o monitor e o executor de verificações
+        self._alerts_lock = threading.Lock()
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._pool = None  # Executor das verificações paralelas, reutilizado entre chamadas
+        self._last_fingerprint = None
+        self._last_alerts = []
+        self._estimate_data_version = None  # Chave da cache de estimativas (independente de _last_fingerprint)
+        self._metrics_cache = None
+        self._metrics_cache_key = None
+        # Cache por instância: as entradas dependem da base de dados desta instância
+        self._estimate_win_probability_cached = functools.lru_cache(maxsize=512)(
+            self._query_win_probability
+        )
+    
+    def _get_conn(self) -> sqlite3.Connection:
+        """Obter a ligação persistente à base de dados (criada na primeira utilização)"""
+        if self._conn is None:
+            # O monitor corre numa thread em background, daí check_same_thread=False.
+            # As consultas são constantes do módulo, pelo que a cache de statements
+            # compilados da ligação evita repetir o parse/plan a cada chamada.
+            conn = sqlite3.connect(
+                self.db.db_path,
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=256
+            )
+            try:
+                conn.executescript("""
+                    PRAGMA journal_mode=WAL;
+                    PRAGMA synchronous=NORMAL;
+                    PRAGMA temp_store=MEMORY;
+                    PRAGMA cache_size=-20000;
+                """)
+            except sqlite3.Error:
+                conn.close()
+                raise
+            # Só fica em cache depois da configuração, para não reutilizar uma ligação a meio
+            self._conn = conn
+        return self._conn
+    
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Obter o executor persistente das verificações (criado na primeira utilização)"""
+        with self._conn_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="alert-check")
+            return self._pool
+    
+    def close(self):
+        """Fechar a ligação persistente à base de dados e o executor das verificações"""
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+        # data_version só é comparável dentro da mesma ligação
+        self._last_fingerprint = None
+        self._metrics_cache_key = None
+        self._estimate_data_version = None
+        
+    def _data_version(self) -> int:
+        """Contador do SQLite que muda sempre que outra ligação faz commit na base de dados"""
+        with self._conn_lock:
+            return self._get_conn().execute("PRAGMA data_version").fetchone()[0]
+    
+    def _fingerprint(self) -> Tuple:
+        """Impressão digital barata do estado das apostas e da banca"""
+        # data_version apanha qualquer escrita (novas apostas, correções de resultado,
+        # edições, banca); a data entra porque as janelas de ROI/anomalias são relativas a hoje
+        return (self._data_version(), datetime.now().date())
+    
+    def invalidate_cache(self):
+        """Forçar nova verificação completa na próxima chamada a check_all_alerts"""
+        self._last_fingerprint = None
+        self._estimate_win_probability_cached.cache_clear()
+    
     def load_alerts_config(self) -> Dict:
         """Carregar configurações de alertas"""
         default_config = {
@@ -57,11 +204,17 @@ class AlertSystem:
         }
         
         try:
-            config_path = Path('config/alerts_config.json')
-            if config_path.exists():
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    saved_config = json.load(f)
-                    default_config.update(saved_config)
+            mtime = _CONFIG_PATH.stat().st_mtime
+            if mtime != _CONFIG_CACHE['mtime']:
+                if ORJSON_AVAILABLE:
+                    _CONFIG_CACHE['data'] = orjson.loads(_CONFIG_PATH.read_bytes())
+                else:
+                    with open(_CONFIG_PATH, 'r', encoding='utf-8') as f:
+                        _CONFIG_CACHE['data'] = json.load(f)
+                _CONFIG_CACHE['mtime'] = mtime
+            
+            # Cópia profunda: cada instância altera a sua configuração (ex.: enabled_alerts)
+            default_config.update(copy.deepcopy(_CONFIG_CACHE['data']))
         except Exception:
             pass
         
@@ -70,54 +223,118 @@ class AlertSystem:
     def save_alerts_config(self):
         """Salvar configurações de alertas"""
         try:
-            config_path = Path('config')
-            config_path.mkdir(exist_ok=True)
+            _CONFIG_PATH.parent.mkdir(exist_ok=True)
             
-            with open(config_path / 'alerts_config.json', 'w', encoding='utf-8') as f:
-                json.dump(self.alerts_config, f, indent=2, ensure_ascii=False)
+            # Escrever num ficheiro temporário e substituir, para nunca deixar o JSON a meio
+            fd, tmp_path = tempfile.mkstemp(dir=_CONFIG_PATH.parent, suffix='.tmp')
+            try:
+                # Serializar primeiro e escrever de uma só vez (json.dump faz uma escrita por fragmento)
+                if ORJSON_AVAILABLE:
+                    content = orjson.dumps(self.alerts_config, option=orjson.OPT_INDENT_2)
+                else:
+                    content = json.dumps(self.alerts_config, indent=2, ensure_ascii=False).encode('utf-8')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, _CONFIG_PATH)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+            
+            _CONFIG_CACHE['data'] = copy.deepcopy(self.alerts_config)
+            _CONFIG_CACHE['mtime'] = _CONFIG_PATH.stat().st_mtime
         except Exception as e:
             print(f"Erro ao salvar configurações: {e}")
     
+    def _fetch_summary(self) -> Dict[str, List[Tuple]]:
+        """Obter os dados das verificações de sequência, ROI e anomalias numa só consulta"""
+        with self._conn_lock:
+            rows = self._get_conn().execute(_SUMMARY_QUERY).fetchall()
+        
+        summary = {'streak': [], 'roi30': [], 'anomaly': []}
+        for tag, *values in rows:
+            summary[tag].append(tuple(values))
+        
+        # Dias mais recentes primeiro
+        summary['anomaly'].sort(key=lambda row: row[0], reverse=True)
+        return summary
+    
     def check_all_alerts(self) -> List[Dict]:
         """Verificar todos os tipos de alertas"""
+        # Sem apostas novas nem alterações na banca os resultados seriam os mesmos
+        fingerprint = self._fingerprint()
+        if fingerprint == self._last_fingerprint:
+            return self._last_alerts
+        
+        # Há resultados novos: as probabilidades memorizadas podem estar desatualizadas
+        self._estimate_win_probability_cached.cache_clear()
+        
         new_alerts = []
+        enabled = self.alerts_config['enabled_alerts']
         
-        if self.alerts_config['enabled_alerts']['drawdown']:
-            drawdown_alerts = self.check_drawdown_alert()
-            new_alerts.extend(drawdown_alerts)
+        # Drawdown (RiskAnalyzer) e banca usam ligações próprias: correm em paralelo
+        # com a consulta de resumo, que usa a ligação persistente
+        pool = self._get_pool()
+        drawdown_future = pool.submit(self.check_drawdown_alert, fingerprint) if enabled['drawdown'] else None
+        bankroll_future = pool.submit(self.check_bankroll_alert) if enabled['bankroll_low'] else None
         
-        if self.alerts_config['enabled_alerts']['losing_streak']:
-            streak_alerts = self.check_losing_streak_alert()
+        # Uma só consulta alimenta as verificações de sequência, ROI e anomalias
+        summary = None
+        if any(enabled[key] for key in ('losing_streak', 'roi_warning', 'performance_anomaly')):
+            try:
+                summary = self._fetch_summary()
+            except Exception as e:
+                print(f"Erro ao obter resumo das apostas: {e}")
+        
+        if drawdown_future is not None:
+            new_alerts.extend(drawdown_future.result())
+        
+        if enabled['losing_streak']:
+            streak_alerts = self.check_losing_streak_alert(summary)
             new_alerts.extend(streak_alerts)
         
-        if self.alerts_config['enabled_alerts']['roi_warning']:
-            roi_alerts = self.check_roi_alert()
+        if enabled['roi_warning']:
+            roi_alerts = self.check_roi_alert(summary)
             new_alerts.extend(roi_alerts)
         
-        if self.alerts_config['enabled_alerts']['bankroll_low']:
-            bankroll_alerts = self.check_bankroll_alert()
-            new_alerts.extend(bankroll_alerts)
+        if bankroll_future is not None:
+            new_alerts.extend(bankroll_future.result())
         
-        if self.alerts_config['enabled_alerts']['performance_anomaly']:
-            anomaly_alerts = self.check_performance_anomaly()
+        if enabled['performance_anomaly']:
+            anomaly_alerts = self.check_performance_anomaly(summary)
             new_alerts.extend(anomaly_alerts)
         
-        # Adicionar novos alertas à lista ativa
-        for alert in new_alerts:
-            alert['timestamp'] = datetime.now()
-            alert['id'] = len(self.alert_history) + 1
-            self.active_alerts.append(alert)
-            self.alert_history.append(alert)
+        # Adicionar novos alertas à lista ativa (o lote partilha o mesmo timestamp)
+        now = datetime.now()
+        with self._alerts_lock:
+            for alert in new_alerts:
+                alert['timestamp'] = now
+                alert['id'] = self._next_id
+                self._next_id += 1
+                self.active_alerts[alert['id']] = alert
+                self._active_expiry.append((alert['timestamp'], alert['id']))
+                bisect.insort(self._active_by_severity, (_SEVERITY_RANK.get(alert.get('severity', 'low'), 2), alert['id']))
+                self.alert_history.append(alert)
+        
+        self._last_fingerprint = fingerprint
+        self._last_alerts = new_alerts
         
         return new_alerts
     
-    def check_drawdown_alert(self) -> List[Dict]:
+    def check_drawdown_alert(self, fingerprint: Optional[Tuple] = None) -> List[Dict]:
         """Verificar alerta de drawdown"""
         alerts = []
         
         try:
-            # Calcular drawdown atual
-            risk_metrics = self.risk_analyzer.calculate_basic_metrics()
+            # Calcular drawdown atual (só recarrega as métricas quando as apostas mudam)
+            if fingerprint is None:
+                fingerprint = self._fingerprint()
+            
+            if fingerprint != self._metrics_cache_key:
+                self.risk_analyzer.load_data()
+                self._metrics_cache = self.risk_analyzer.calculate_basic_metrics()
+                self._metrics_cache_key = fingerprint
+            
+            risk_metrics = self._metrics_cache
             
             if 'max_drawdown' in risk_metrics:
                 current_drawdown = abs(risk_metrics['max_drawdown']) * 100
@@ -137,68 +354,42 @@ class AlertSystem:
         
         return alerts
     
-    def check_losing_streak_alert(self) -> List[Dict]:
+    def check_losing_streak_alert(self, summary: Optional[Dict] = None) -> List[Dict]:
         """Verificar alerta de sequência de perdas"""
         alerts = []
         
         try:
-            conn = sqlite3.connect(self.db.db_path)
+            # Sequência atual de perdas (entre as últimas 20 apostas) calculada no SQLite
+            if summary is None:
+                summary = self._fetch_summary()
             
-            # Buscar últimas apostas
-            query = """
-                SELECT resultado 
-                FROM apostas 
-                WHERE resultado IN ('Ganha', 'Perdida')
-                ORDER BY data_hora DESC 
-                LIMIT 20
-            """
+            losing_streak = summary['streak'][0][1]
             
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            
-            if not df.empty:
-                # Contar sequência atual de perdas
-                losing_streak = 0
-                for resultado in df['resultado']:
-                    if resultado == 'Perdida':
-                        losing_streak += 1
-                    else:
-                        break
-                
-                if losing_streak >= self.alerts_config['losing_streak_threshold']:
-                    alerts.append({
-                        'type': 'losing_streak',
-                        'severity': 'high' if losing_streak >= 5 else 'medium',
-                        'title': '🔴 Sequência de Perdas',
-                        'message': f'{losing_streak} apostas perdidas consecutivas',
-                        'details': 'Considere revisar sua estratégia ou fazer uma pausa',
-                        'value': losing_streak,
-                        'threshold': self.alerts_config['losing_streak_threshold']
-                    })
+            if losing_streak and losing_streak >= self.alerts_config['losing_streak_threshold']:
+                alerts.append({
+                    'type': 'losing_streak',
+                    'severity': 'high' if losing_streak >= 5 else 'medium',
+                    'title': '🔴 Sequência de Perdas',
+                    'message': f'{losing_streak} apostas perdidas consecutivas',
+                    'details': 'Considere revisar sua estratégia ou fazer uma pausa',
+                    'value': losing_streak,
+                    'threshold': self.alerts_config['losing_streak_threshold']
+                })
         except Exception as e:
             print(f"Erro ao verificar sequência de perdas: {e}")
         
         return alerts
     
-    def check_roi_alert(self) -> List[Dict]:
+    def check_roi_alert(self, summary: Optional[Dict] = None) -> List[Dict]:
         """Verificar alerta de ROI baixo"""
         alerts = []
         
         try:
-            conn = sqlite3.connect(self.db.db_path)
-            
             # Calcular ROI dos últimos 30 dias
-            query = """
-                SELECT 
-                    SUM(valor_apostado) as total_apostado,
-                    SUM(lucro_prejuizo) as lucro_total
-                FROM apostas 
-                WHERE resultado IN ('Ganha', 'Perdida')
-                AND date(data_hora, 'localtime') >= date('now', '-30 days')
-            """
+            if summary is None:
+                summary = self._fetch_summary()
             
-            result = conn.execute(query).fetchone()
-            conn.close()
+            result = summary['roi30'][0][3:]
             
             if result and result[0] and result[0] > 0:
                 roi = (result[1] / result[0]) * 100
@@ -245,42 +436,37 @@ class AlertSystem:
         
         return alerts
     
-    def check_performance_anomaly(self) -> List[Dict]:
+    def check_performance_anomaly(self, summary: Optional[Dict] = None) -> List[Dict]:
         """Verificar anomalias de performance"""
         alerts = []
         
         try:
-            conn = sqlite3.connect(self.db.db_path)
-            
-            # Analisar performance por período
-            query = """
-                SELECT 
-                    date(data_hora, 'localtime') as data,
-                    COUNT(*) as apostas,
-                    SUM(CASE WHEN resultado = 'Ganha' THEN 1 ELSE 0 END) as ganhas,
-                    SUM(valor_apostado) as total_apostado,
-                    SUM(lucro_prejuizo) as lucro
-                FROM apostas 
-                WHERE resultado IN ('Ganha', 'Perdida')
-                AND date(data_hora, 'localtime') >= date('now', '-14 days')
-                GROUP BY date(data_hora, 'localtime')
-                ORDER BY data DESC
-            """
+            # Analisar performance por dia (últimos 14 dias)
+            if summary is None:
+                summary = self._fetch_summary()
             
-            df = pd.read_sql_query(query, conn)
-            conn.close()
+            rows = summary['anomaly']
             
-            if len(df) >= 7:  # Pelo menos uma semana de dados
-                # Calcular métricas
-                df['win_rate'] = df['ganhas'] / df['apostas']
-                df['roi'] = df['lucro'] / df['total_apostado']
+            if len(rows) >= 7:  # Pelo menos uma semana de dados
+                # Calcular métricas (arrays pequenos: numpy evita o overhead das Series)
+                _, apostas, ganhas, total_apostado, lucro = zip(*rows)
+                apostas = np.asarray(apostas, dtype=np.float64)
+                ganhas = np.asarray(ganhas, dtype=np.float64)
+                total_apostado = np.asarray(total_apostado, dtype=np.float64)
+                lucro = np.asarray(lucro, dtype=np.float64)
                 
-                # Detectar anomalias
-                recent_win_rate = df['win_rate'].head(3).mean()  # Últimos 3 dias
-                historical_win_rate = df['win_rate'].tail(7).mean()  # Últimos 7 dias
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    win_rate = ganhas / apostas
+                    roi = lucro / total_apostado
                 
-                recent_roi = df['roi'].head(3).mean()
-                historical_roi = df['roi'].tail(7).mean()
+                # Detectar anomalias (dias sem valor apostado dão NaN e são ignorados)
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', category=RuntimeWarning)
+                    recent_win_rate = np.nanmean(win_rate[:3])  # Últimos 3 dias
+                    historical_win_rate = np.nanmean(win_rate[-7:])  # Últimos 7 dias
+                    
+                    recent_roi = np.nanmean(roi[:3])
+                    historical_roi = np.nanmean(roi[-7:])
                 
                 # Alerta se performance recente muito diferente
                 if abs(recent_win_rate - historical_win_rate) > 0.3:  # 30% de diferença
@@ -315,9 +501,15 @@ class AlertSystem:
         """Verificar alertas para uma aposta específica"""
         alerts = []
         
+        # Chamado a cada aposta introduzida: ler a configuração uma só vez
+        cfg = self.alerts_config
+        enabled = cfg['enabled_alerts']
+        odd_threshold = cfg['odd_threshold']
+        kelly_threshold = cfg['kelly_threshold']
+        
         try:
             # Alerta de odd muito alta
-            if self.alerts_config['enabled_alerts']['high_risk_bet'] and odd > self.alerts_config['odd_threshold']:
+            if enabled['high_risk_bet'] and odd > odd_threshold:
                 alerts.append({
                     'type': 'high_risk_bet',
                     'severity': 'medium',
@@ -325,11 +517,11 @@ class AlertSystem:
                     'message': f'Odd {odd:.2f} é considerada de alto risco',
                     'details': 'Apostas com odds altas têm menor probabilidade de sucesso',
                     'value': odd,
-                    'threshold': self.alerts_config['odd_threshold']
+                    'threshold': odd_threshold
                 })
             
             # Alerta de valor da aposta vs banca
-            saldo_atual = self.db.obter_saldo_atual()
+            saldo_atual = self.db.get_saldo_atual()
             percentual_banca = (valor / saldo_atual) * 100 if saldo_atual > 0 else 0
             
             if percentual_banca > 10:  # Mais de 10% da banca
@@ -353,7 +545,7 @@ class AlertSystem:
                     # Calcular Kelly
                     kelly = (estimated_prob * odd - 1) / (odd - 1)
                     
-                    if kelly > self.alerts_config['kelly_threshold']:
+                    if kelly > kelly_threshold:
                         alerts.append({
                             'type': 'kelly_warning',
                             'severity': 'medium',
@@ -361,11 +553,11 @@ class AlertSystem:
                             'message': f'Kelly sugere {kelly:.1%} da banca',
                             'details': 'Valor sugerido pode ser muito alto para esta aposta',
                             'value': kelly,
-                            'threshold': self.alerts_config['kelly_threshold']
+                            'threshold': kelly_threshold
                         })
                     
                     # Oportunidade de valor
-                    if self.alerts_config['enabled_alerts']['value_opportunity']:
+                    if enabled['value_opportunity']:
                         expected_value = (estimated_prob * odd) - 1
                         if expected_value > 0.1:  # 10% de valor esperado
                             alerts.append({
@@ -388,50 +580,68 @@ class AlertSystem:
     def estimate_win_probability(self, equipa_casa: str, equipa_fora: str) -> float:
         """Estimar probabilidade de vitória baseada no histórico"""
         try:
-            conn = sqlite3.connect(self.db.db_path)
-            
-            # Buscar histórico das equipas
-            query = """
-                SELECT resultado 
-                FROM apostas 
-                WHERE (equipa_casa = ? OR equipa_fora = ? OR equipa_casa = ? OR equipa_fora = ?)
-                AND resultado IN ('Ganha', 'Perdida')
-                ORDER BY data_hora DESC 
-                LIMIT 20
-            """
-            
-            df = pd.read_sql_query(query, conn, params=[equipa_casa, equipa_casa, equipa_fora, equipa_fora])
-            conn.close()
-            
-            if not df.empty:
-                win_rate = (df['resultado'] == 'Ganha').mean()
-                return max(0.1, min(0.9, win_rate))  # Limitar entre 10% e 90%
-            
-            return 0.5  # Probabilidade neutra se não há dados
-            
+            return self._estimate_win_probability_cached(equipa_casa, equipa_fora)
         except Exception:
             return 0.5
     
+    def _query_win_probability(self, equipa_casa: str, equipa_fora: str) -> float:
+        """Consultar o histórico das equipas (resultado memorizado por fixture)"""
+        # Buscar histórico das equipas
+        with self._conn_lock:
+            rows = self._get_conn().execute(
+                _ESTIMATE_QUERY, (equipa_casa, equipa_casa, equipa_fora, equipa_fora)
+            ).fetchall()
+        
+        if rows:
+            win_rate = sum(1 for (resultado,) in rows if resultado == 'Ganha') / len(rows)
+            return max(0.1, min(0.9, win_rate))  # Limitar entre 10% e 90%
+        
+        return 0.5  # Probabilidade neutra se não há dados
+    
     def dismiss_alert(self, alert_id: int):
         """Dispensar um alerta"""
-        self.active_alerts = [alert for alert in self.active_alerts if alert.get('id') != alert_id]
+        with self._alerts_lock:
+            self.active_alerts.pop(alert_id, None)
+    
+    def clear_active_alerts(self):
+        """Dispensar todos os alertas ativos"""
+        with self._alerts_lock:
+            self.active_alerts.clear()
+            self._active_expiry.clear()
+            self._active_by_severity.clear()
     
     def get_active_alerts(self) -> List[Dict]:
         """Obter alertas ativos"""
-        return self.active_alerts
+        with self._alerts_lock:
+            return list(self.active_alerts.values())
+    
+    def get_active_alerts_sorted(self) -> List[Dict]:
+        """Obter alertas ativos ordenados por severidade (mais graves primeiro)"""
+        # A ordem é mantida na inserção; aqui só se descartam alertas já dispensados ou expirados
+        with self._alerts_lock:
+            self._active_by_severity[:] = [
+                entry for entry in self._active_by_severity if entry[1] in self.active_alerts
+            ]
+            return [self.active_alerts[alert_id] for _, alert_id in self._active_by_severity]
     
     def get_alert_history(self, days: int = 7) -> List[Dict]:
-        """Obter histórico de alertas"""
+        """Obter histórico de alertas (mais recente primeiro)"""
         cutoff_date = datetime.now() - timedelta(days=days)
-        return [alert for alert in self.alert_history if alert.get('timestamp', datetime.now()) >= cutoff_date]
+        # O histórico está ordenado por timestamp: pesquisa binária pelo primeiro alerta no período
+        with self._alerts_lock:
+            start = bisect.bisect_left(self.alert_history, cutoff_date, key=itemgetter('timestamp'))
+            history = list(itertools.islice(self.alert_history, start, None))
+        history.reverse()
+        return history
     
     def clear_old_alerts(self, hours: int = 24):
         """Limpar alertas antigos"""
         cutoff_time = datetime.now() - timedelta(hours=hours)
-        self.active_alerts = [
-            alert for alert in self.active_alerts 
-            if alert.get('timestamp', datetime.now()) >= cutoff_time
-        ]
+        # Os alertas entram por ordem cronológica: basta retirar do início da fila
+        with self._alerts_lock:
+            while self._active_expiry and self._active_expiry[0][0] < cutoff_time:
+                _, alert_id = self._active_expiry.popleft()
+                self.active_alerts.pop(alert_id, None)
 
 class AlertMonitor:
     """Monitor de alertas em background"""
@@ -441,19 +651,24 @@ class AlertMonitor:
         self.callback = callback
         self.running = False
         self.thread = None
+        self._stop = threading.Event()
     
     def start_monitoring(self):
         """Iniciar monitoramento"""
         if not self.running:
             self.running = True
+            self._stop.clear()
             self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
             self.thread.start()
     
     def stop_monitoring(self):
         """Parar monitoramento"""
+        # Acorda a thread de imediato, mesmo a meio da espera entre verificações
+        self._stop.set()
         self.running = False
         if self.thread:
-            self.thread.join(timeout=1)
+            self.thread.join(timeout=2)
+        self.alert_system.close()
     
     def _monitor_loop(self):
         """Loop principal de monitoramento"""
@@ -471,24 +686,48 @@ class AlertMonitor:
                 
                 # Aguardar próxima verificação
                 interval = self.alert_system.alerts_config.get('check_interval', 300)
-                time.sleep(interval)
+                if self._stop.wait(interval):
+                    break
                 
             except Exception as e:
                 print(f"Erro no monitor de alertas: {e}")
-                time.sleep(60)  # Aguardar 1 minuto em caso de erro
+                self._stop.wait(60)  # Aguardar 1 minuto em caso de erro
 
 class AlertsInterface(ctk.CTkFrame):
     """Interface para gerenciamento de alertas"""
     
+    # Cores por severidade: (borda, fundo)
+    _SEVERITY_COLORS = {
+        'high': ("#ff4444", "#ffeeee"),
+        'medium': ("#ff8800", "#fff4e6"),
+        'low': ("#4488ff", "#eef4ff")
+    }
+    
     def __init__(self, parent, db: DatabaseManager):
         super().__init__(parent)
         self.db = db
         self.alert_system = AlertSystem(db)
         self.monitor = AlertMonitor(self.alert_system, self.on_new_alerts)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._last_check_monotonic = 0.0
+        self._reload_pending = False
+        self._pending_high: List[Dict] = []
+        self._notify_scheduled = False
+        self._toast = None
+        self._toast_after = None
+        
+        # Fontes partilhadas pelas linhas das listas (evita criar uma fonte Tk por widget)
+        self._font_small = ctk.CTkFont(size=10)
+        self._font_body = ctk.CTkFont(size=12)
+        self._font_alert_title = ctk.CTkFont(size=14, weight="bold")
+        self._font_empty = ctk.CTkFont(size=16)
         
         self.setup_ui()
         self.load_alerts()
         
+        # Parar o monitor com o ciclo de vida do widget (e não no __del__, que pode correr no fecho do interpretador)
+        self.bind("<Destroy>", self._on_destroy)
+        
         # Iniciar monitoramento após um pequeno delay para garantir que a interface esteja pronta
         self.after(1000, self.start_monitoring)
     
@@ -552,6 +791,8 @@ class AlertsInterface(ctk.CTkFrame):
         # Frame para lista de alertas
         self.alerts_list_frame = ctk.CTkScrollableFrame(alerts_frame)
         self.alerts_list_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        # Os alertas ocupam linhas fixas da grelha (sem recálculo de todos os irmãos a cada inserção)
+        self.alerts_list_frame.grid_columnconfigure(0, weight=1)
     
     def create_config_tab(self):
         """Criar aba de configurações"""
@@ -673,9 +914,11 @@ class AlertsInterface(ctk.CTkFrame):
         )
         refresh_history_btn.pack(side="left", padx=10)
         
-        # Lista de histórico
-        self.history_list_frame = ctk.CTkScrollableFrame(history_frame)
-        self.history_list_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        # Lista de histórico: uma única caixa de texto, com a severidade marcada por etiquetas
+        self.history_text = ctk.CTkTextbox(history_frame, wrap="word", state="disabled")
+        self.history_text.pack(fill="both", expand=True, padx=10, pady=10)
+        for severity, (color, _) in self._SEVERITY_COLORS.items():
+            self.history_text.tag_config(severity, foreground=color)
     
     def load_alerts(self):
         """Carregar alertas ativos"""
@@ -683,42 +926,38 @@ class AlertsInterface(ctk.CTkFrame):
         for widget in self.alerts_list_frame.winfo_children():
             widget.destroy()
         
-        active_alerts = self.alert_system.get_active_alerts()
+        active_alerts = self.alert_system.get_active_alerts_sorted()  # Já ordenados por severidade
         
         if not active_alerts:
             no_alerts_label = ctk.CTkLabel(
                 self.alerts_list_frame,
                 text="✅ Nenhum alerta ativo",
-                font=ctk.CTkFont(size=16)
+                font=self._font_empty
             )
-            no_alerts_label.pack(pady=50)
+            no_alerts_label.grid(row=0, column=0, pady=50)
             return
         
-        # Ordenar por severidade
-        severity_order = {'high': 0, 'medium': 1, 'low': 2}
-        active_alerts.sort(key=lambda x: severity_order.get(x.get('severity', 'low'), 2))
-        
-        for alert in active_alerts:
-            self.create_alert_widget(alert)
+        # Esconder a lista durante a reconstrução: o Tk calcula a geometria uma única vez no fim
+        self.alerts_list_frame.pack_forget()
+        try:
+            for row, alert in enumerate(active_alerts):
+                self.create_alert_widget(alert, row)
+        finally:
+            self.alerts_list_frame.pack(fill="both", expand=True, padx=10, pady=10)
+            # update_idletasks e não update(): só processa a geometria pendente, sem reentrar no ciclo de eventos
+            self.alerts_list_frame.update_idletasks()
     
-    def create_alert_widget(self, alert: Dict):
+    def create_alert_widget(self, alert: Dict, row: int = 0):
         """Criar widget para um alerta"""
-        # Cores por severidade
-        colors = {
-            'high': ("#ff4444", "#ffeeee"),
-            'medium': ("#ff8800", "#fff4e6"),
-            'low': ("#4488ff", "#eef4ff")
-        }
-        
         severity = alert.get('severity', 'low')
-        border_color, bg_color = colors.get(severity, colors['low'])
+        border_color, bg_color = self._SEVERITY_COLORS.get(severity, self._SEVERITY_COLORS['low'])
         
         alert_frame = ctk.CTkFrame(
             self.alerts_list_frame,
             border_width=2,
             border_color=border_color
         )
-        alert_frame.pack(fill="x", padx=5, pady=5)
+        alert_frame.grid(row=row, column=0, sticky="ew", padx=5, pady=5)
         
         # Cabeçalho do alerta
         header_frame = ctk.CTkFrame(alert_frame)
@@ -727,7 +966,7 @@ class AlertsInterface(ctk.CTkFrame):
         title_label = ctk.CTkLabel(
             header_frame,
             text=alert.get('title', 'Alerta'),
-            font=ctk.CTkFont(size=14, weight="bold")
+            font=self._font_alert_title
         )
         title_label.pack(side="left")
         
@@ -736,7 +975,7 @@ class AlertsInterface(ctk.CTkFrame):
         time_label = ctk.CTkLabel(
             header_frame,
             text=timestamp.strftime("%H:%M"),
-            font=ctk.CTkFont(size=10)
+            font=self._font_small
         )
         time_label.pack(side="right")
         
@@ -754,7 +993,7 @@ class AlertsInterface(ctk.CTkFrame):
         message_label = ctk.CTkLabel(
             alert_frame,
             text=alert.get('message', ''),
-            font=ctk.CTkFont(size=12)
+            font=self._font_body
         )
         message_label.pack(anchor="w", padx=15, pady=2)
         
@@ -763,39 +1002,63 @@ class AlertsInterface(ctk.CTkFrame):
             details_label = ctk.CTkLabel(
                 alert_frame,
                 text=alert.get('details'),
-                font=ctk.CTkFont(size=10),
+                font=self._font_small,
                 text_color="gray"
             )
             details_label.pack(anchor="w", padx=15, pady=2)
     
+    def _schedule_reload(self):
+        """Agendar uma recarga da lista, agrupando pedidos feitos em rajada"""
+        if not self._reload_pending:
+            self._reload_pending = True
+            self.after(50, self._do_reload)
+    
+    def _do_reload(self):
+        """Executar a recarga agendada"""
+        self._reload_pending = False
+        self.load_alerts()
+    
     def refresh_alerts(self):
         """Atualizar lista de alertas"""
-        # Verificar novos alertas
-        self.alert_system.check_all_alerts()
+        # Cliques repetidos em menos de 0,5 s só recarregam a lista
+        if time.monotonic() - self._last_check_monotonic < 0.5:
+            self._schedule_reload()
+            return
+        
+        # Verificar novos alertas fora da thread da interface
+        future = self._executor.submit(self.alert_system.check_all_alerts)
+        future.add_done_callback(lambda f: self.after(0, self._on_check_done, f))
+    
+    def _on_check_done(self, future):
+        """Recarregar a interface quando a verificação em background termina"""
+        if future.exception() is not None:
+            print(f"Erro ao verificar alertas: {future.exception()}")
+        else:
+            self._last_check_monotonic = time.monotonic()
         
         # Recarregar interface
-        self.load_alerts()
+        self._schedule_reload()
     
     def clear_all_alerts(self):
         """Limpar todos os alertas"""
-        self.alert_system.active_alerts.clear()
-        self.load_alerts()
+        self.alert_system.clear_active_alerts()
+        self._schedule_reload()
     
     def dismiss_alert(self, alert_id: int):
         """Dispensar um alerta específico"""
         self.alert_system.dismiss_alert(alert_id)
-        self.load_alerts()
+        self._schedule_reload()
     
     def save_config(self):
         """Salvar configurações"""
         try:
-            # Atualizar configurações de limites
-            for key, var in self.config_vars.items():
-                self.alert_system.alerts_config[key] = var.get()
+            # Ler todos os valores da interface de uma vez
+            new_config = {key: var.get() for key, var in self.config_vars.items()}
+            new_enabled = {key: var.get() for key, var in self.enabled_vars.items()}
             
-            # Atualizar configurações de alertas habilitados
-            for key, var in self.enabled_vars.items():
-                self.alert_system.alerts_config['enabled_alerts'][key] = var.get()
+            # Atualizar configurações de limites e de alertas habilitados
+            self.alert_system.alerts_config.update(new_config)
+            self.alert_system.alerts_config['enabled_alerts'].update(new_enabled)
             
             # Salvar no arquivo
             self.alert_system.save_alerts_config()
@@ -807,113 +1070,119 @@ class AlertsInterface(ctk.CTkFrame):
     
     def refresh_history(self):
         """Atualizar histórico de alertas"""
-        # Limpar lista atual
-        for widget in self.history_list_frame.winfo_children():
-            widget.destroy()
-        
         # Obter número de dias
         days_text = self.history_days.get()
         days = int(days_text.split()[0])
         
+        # Já vem ordenado por timestamp (mais recente primeiro)
         history = self.alert_system.get_alert_history(days)
         
-        if not history:
-            no_history_label = ctk.CTkLabel(
-                self.history_list_frame,
-                text="📝 Nenhum alerta no período selecionado",
-                font=ctk.CTkFont(size=16)
-            )
-            no_history_label.pack(pady=50)
-            return
-        
-        # Ordenar por timestamp (mais recente primeiro)
-        history.sort(key=lambda x: x.get('timestamp', datetime.now()), reverse=True)
-        
+        # Montar todo o texto de uma vez; cada alerta ocupa duas linhas (cabeçalho e mensagem)
+        lines = []
+        severities = []
         for alert in history:
-            self.create_history_widget(alert)
-    
-    def create_history_widget(self, alert: Dict):
-        """Criar widget para histórico de alerta"""
-        history_frame = ctk.CTkFrame(self.history_list_frame)
-        history_frame.pack(fill="x", padx=5, pady=2)
-        
-        # Timestamp
-        timestamp = alert.get('timestamp', datetime.now())
-        time_label = ctk.CTkLabel(
-            history_frame,
-            text=timestamp.strftime("%d/%m %H:%M"),
-            font=ctk.CTkFont(size=10),
-            width=80
-        )
-        time_label.pack(side="left", padx=5)
-        
-        # Título e mensagem
-        content_frame = ctk.CTkFrame(history_frame)
-        content_frame.pack(side="left", fill="x", expand=True, padx=5)
-        
-        title_label = ctk.CTkLabel(
-            content_frame,
-            text=alert.get('title', 'Alerta'),
-            font=ctk.CTkFont(size=12, weight="bold")
-        )
-        title_label.pack(anchor="w")
-        
-        message_label = ctk.CTkLabel(
-            content_frame,
-            text=alert.get('message', ''),
-            font=ctk.CTkFont(size=10)
-        )
-        message_label.pack(anchor="w")
-        
-        # Indicador de severidade
-        severity_colors = {
-            'high': "#ff4444",
-            'medium': "#ff8800",
-            'low': "#4488ff"
-        }
+            timestamp, title, message, severity = self._history_fields(alert)
+            severities.append(severity)
+            lines.append(f"■ {_format_history_time(timestamp)}  {title}".replace('\n', ' '))
+            lines.append(f"      {message}".replace('\n', ' '))
         
-        severity = alert.get('severity', 'low')
-        severity_indicator = ctk.CTkFrame(
-            history_frame,
-            width=10,
-            height=40,
-            fg_color=severity_colors.get(severity, "#4488ff")
+        self.history_text.configure(state="normal")
+        self.history_text.delete("1.0", "end")
+        if not history:
+            self.history_text.insert("1.0", "📝 Nenhum alerta no período selecionado")
+        else:
+            self.history_text.insert("1.0", '\n'.join(lines))
+            for row, severity in enumerate(severities):
+                line = 2 * row + 1
+                self.history_text.tag_add(severity, f"{line}.0", f"{line}.end")
+        self.history_text.configure(state="disabled")
+    
+    @staticmethod
+    def _history_fields(alert: Dict) -> Tuple[datetime, str, str, str]:
+        """Ler de uma vez os campos usados numa linha do histórico"""
+        return (
+            alert.get('timestamp') or datetime.min,
+            alert.get('title', 'Alerta'),
+            alert.get('message', ''),
+            alert.get('severity', 'low')
         )
-        severity_indicator.pack(side="right", padx=5)
     
     def on_new_alerts(self, new_alerts: List[Dict]):
         """Callback para novos alertas"""
         # Atualizar interface na thread principal
-        self.after(0, self.load_alerts)
+        self._schedule_reload()
         
-        # Mostrar notificação para alertas de alta severidade
-        high_severity_alerts = [alert for alert in new_alerts if alert.get('severity') == 'high']
+        # Acumular alertas de alta severidade: rajadas seguidas geram uma única notificação
+        severity_of = itemgetter('severity')  # todos os alertas gerados têm severidade
+        self._pending_high.extend(alert for alert in new_alerts if severity_of(alert) == 'high')
         
-        if high_severity_alerts:
-            self.after(0, lambda: self.show_alert_notification(high_severity_alerts))
+        if self._pending_high and not self._notify_scheduled:
+            self._notify_scheduled = True
+            self.after(100, self._flush_notifications)
+    
+    def _flush_notifications(self):
+        """Mostrar de uma vez as notificações acumuladas"""
+        self._notify_scheduled = False
+        alerts, self._pending_high = self._pending_high, []
+        if alerts:
+            self.show_alert_notification(alerts)
     
     def show_alert_notification(self, alerts: List[Dict]):
-        """Mostrar notificação de alertas importantes"""
-        if len(alerts) == 1:
+        """Mostrar notificação de alertas importantes (sem bloquear a interface)"""
+        count = len(alerts)
+        if count == 1:
             alert = alerts[0]
-            messagebox.showwarning(
-                alert.get('title', 'Alerta'),
-                alert.get('message', '') + '\n\n' + alert.get('details', '')
+            text = f"{alert.get('title', 'Alerta')}\n{alert.get('message', '')}\n\n{alert.get('details', '')}"
+        else:
+            lines = [f"Foram detectados {count} alertas importantes:\n"]
+            lines.extend(
+                f"• {alert.get('title', 'Alerta')}: {alert.get('message', '')}"
+                for alert in alerts[:3]  # Mostrar apenas os primeiros 3
             )
+            text = '\n'.join(lines) + '\n'
+            
+            if count > 3:
+                text += f"\n... e mais {count - 3} alertas"
+        
+        toast = self._toast
+        if toast is not None and toast.winfo_exists():
+            # Já há uma notificação visível: juntar a mensagem e reiniciar o temporizador
+            toast.label.configure(text=f"{toast.label.cget('text')}\n\n{text}")
+            self.after_cancel(self._toast_after)
         else:
-            message = f"Foram detectados {len(alerts)} alertas importantes:\n\n"
-            for alert in alerts[:3]:  # Mostrar apenas os primeiros 3
-                message += f"• {alert.get('title', 'Alerta')}: {alert.get('message', '')}\n"
+            toast = self._toast = ctk.CTkToplevel(self)
+            toast.overrideredirect(True)
+            toast.attributes("-topmost", True)
+            toast.configure(fg_color=self._SEVERITY_COLORS['high'][0])
             
-            if len(alerts) > 3:
-                message += f"\n... e mais {len(alerts) - 3} alertas"
+            toast.label = ctk.CTkLabel(
+                toast,
+                text=text,
+                text_color="white",
+                justify="left",
+                wraplength=350
+            )
+            toast.label.pack(padx=15, pady=10)
+            toast.label.bind("<Button-1>", lambda e: self._close_toast())
             
-            messagebox.showwarning("Múltiplos Alertas", message)
+            # Canto superior direito da aba de alertas
+            toast.update_idletasks()
+            x = self.winfo_rootx() + self.winfo_width() - toast.winfo_reqwidth() - 20
+            y = self.winfo_rooty() + 20
+            toast.geometry(f"+{x}+{y}")
+        
+        self._toast_after = self.after(3000, self._close_toast)
+    
+    def _close_toast(self):
+        """Fechar a notificação, se ainda estiver aberta"""
+        if self._toast is not None and self._toast.winfo_exists():
+            self._toast.destroy()
+        self._toast = None
     
-    def __del__(self):
-        """Destructor para parar o monitor"""
-        if hasattr(self, 'monitor'):
-            self.monitor.stop_monitoring()
+    def _on_destroy(self, event=None):
+        """Parar o monitor quando o widget é destruído"""
+        self._executor.shutdown(wait=False)
+        self.monitor.stop_monitoring()
 
 # Função para integrar na aplicação principal
 def create_alerts_tab(parent, db: DatabaseManager):
@@ -923,5 +1192,19 @@ def create_alerts_tab(parent, db: DatabaseManager):
 # Função para verificar alertas de uma aposta
 def check_bet_alerts(db: DatabaseManager, equipa_casa: str, equipa_fora: str, odd: float, valor: float) -> List[Dict]:
     """Verificar alertas para uma aposta específica"""
-    alert_system = AlertSystem(db)
-    return alert_system.check_bet_alert(equipa_casa, equipa_fora, odd, valor)
\ No newline at end of file
+    alert_system = _get_alert_system(db)
+    
+    # A instância é partilhada: reler a configuração (cache por mtime) e
+    # descartar as estimativas memorizadas se a base de dados mudou
+    alert_system.alerts_config = alert_system.load_alerts_config()
+    data_version = alert_system._data_version()
+    if data_version != alert_system._estimate_data_version:
+        alert_system._estimate_win_probability_cached.cache_clear()
+        alert_system._estimate_data_version = data_version
+    
+    return alert_system.check_bet_alert(equipa_casa, equipa_fora, odd, valor)
+
+@functools.lru_cache(maxsize=4)
+def _get_alert_system(db: DatabaseManager) -> AlertSystem:
+    """Instância de AlertSystem partilhada por base de dados"""
+    return AlertSystem(db)
\ No newline at end of file
@@ -4,33 +4,125 @@
 Módulo de Análise Avançada e Machine Learning
 """
 
+import io
+import importlib.util
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import customtkinter as ctk
 import pandas as pd
 import numpy as np
 from datetime import datetime, date, timedelta
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import seaborn as sns
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Tuple
 from main import DatabaseManager
 import sqlite3
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import threading
 
 # Machine Learning removido conforme solicitado
 
-# Imports para relatórios
+# Relatórios PDF: o reportlab só é importado ao exportar
+PDF_AVAILABLE = importlib.util.find_spec('reportlab') is not None
+
+# Colunas Arrow ao ler da base de dados (opcional; dtype_backend requer pandas >= 2.0)
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+# Compilação JIT do cálculo de sequências (opcional)
 try:
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib import colors
-    from reportlab.lib.units import inch
-    PDF_AVAILABLE = True
+    from numba import njit
+    NUMBA_AVAILABLE = True
 except ImportError:
-    PDF_AVAILABLE = False
+    NUMBA_AVAILABLE = False
+
+# Motor de Excel mais rápido e com menos memória que o openpyxl (opcional; o pandas só o importa ao exportar)
+XLSXWRITER_AVAILABLE = importlib.util.find_spec('xlsxwriter') is not None
+
+# Faixas de odds: limites interiores (intervalos fechados à direita, como no pd.cut) e rótulos
+_ODD_EDGES = np.array([1.5, 2.0, 3.0, 5.0], dtype=np.float64)
+_ODD_LABELS = ['Muito Baixa (<1.5)', 'Baixa (1.5-2.0)', 'Média (2.0-3.0)', 'Alta (3.0-5.0)', 'Muito Alta (>5.0)']
+_SUGGESTION_ODD_EDGES = np.array([1.8, 2.5, 4.0], dtype=np.float64)
+_SUGGESTION_ODD_LABELS = ['Baixa', 'Média', 'Alta', 'Muito Alta']
+
+# Linhas por bloco na escrita da folha de apostas do Excel
+_EXCEL_CHUNK_ROWS = 5000
+
+# Colunas auxiliares das análises, que não fazem parte da folha de apostas exportada
+_HELPER_COLUMNS = ['ganha_flag', 'faixa_odd', 'dia_semana', 'faixa_odd_sugestao']
+
+def _odd_band_codes(odds: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Índice da faixa de cada odd como soma de comparações, sem ramos (-1 para odds inválidas)"""
+    codes = np.zeros(len(odds), dtype=np.int8)
+    for edge in edges:
+        codes += odds > edge
+    codes[~(odds > 0)] = -1
+    return codes
+
+def _aggregate_by(keys: pd.Series, wins: np.ndarray, profit: np.ndarray, stake: np.ndarray) -> pd.DataFrame:
+    """Total, vitórias, lucro e valor apostado por grupo, com uma contagem ponderada por coluna"""
+    codes, uniques = pd.factorize(keys, sort=True)
+    valid = codes >= 0
+    codes = codes[valid]
+    n_groups = len(uniques)
+    
+    # Valores em falta não contam para as somas, como no groupby
+    return pd.DataFrame({
+        'Total': np.bincount(codes, minlength=n_groups),
+        'Ganhas': np.bincount(codes, weights=wins[valid], minlength=n_groups).astype(np.int64),
+        'Lucro': np.bincount(codes, weights=np.nan_to_num(profit[valid]), minlength=n_groups),
+        'Apostado': np.bincount(codes, weights=np.nan_to_num(stake[valid]), minlength=n_groups)
+    }, index=pd.Index(uniques, name=keys.name))
+
+def _streaks_numpy(results: np.ndarray) -> Tuple[int, float, int, float]:
+    """Maior e média das sequências de vitórias/derrotas por run-length encoding"""
+    results = results[(results == 'Ganha') | (results == 'Perdida')]
+    
+    changes = np.flatnonzero(results[1:] != results[:-1]) + 1
+    starts = np.r_[0, changes] if len(results) else changes
+    lengths = np.diff(np.r_[starts, len(results)])
+    labels = results[starts]
+    
+    win_sequences = lengths[labels == 'Ganha']
+    loss_sequences = lengths[labels == 'Perdida']
+    return (
+        int(win_sequences.max()) if win_sequences.size else 0,
+        float(win_sequences.mean()) if win_sequences.size else 0.0,
+        int(loss_sequences.max()) if loss_sequences.size else 0,
+        float(loss_sequences.mean()) if loss_sequences.size else 0.0
+    )
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _streaks(codes):
+        """Mesmo cálculo numa única passagem compilada (1 = ganha, 0 = perdida, -1 = ignorada)"""
+        max_win = 0
+        max_loss = 0
+        win_total = 0
+        loss_total = 0
+        win_runs = 0
+        loss_runs = 0
+        current = -1
+        run = 0
+        for i in range(codes.shape[0] + 1):
+            code = codes[i] if i < codes.shape[0] else -2  # sentinela fecha a última sequência
+            if code == -1:
+                continue
+            if code == current:
+                run += 1
+                continue
+            if current == 1:
+                max_win = max(max_win, run)
+                win_total += run
+                win_runs += 1
+            elif current == 0:
+                max_loss = max(max_loss, run)
+                loss_total += run
+                loss_runs += 1
+            current = code
+            run = 1
+        
+        mean_win = win_total / win_runs if win_runs else 0.0
+        mean_loss = loss_total / loss_runs if loss_runs else 0.0
+        return max_win, mean_win, max_loss, mean_loss
 
 class AnaliseFrame(ctk.CTkScrollableFrame):
     """Frame para análise avançada e machine learning"""
@@ -39,8 +131,18 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
         super().__init__(parent)
         self.db = db
         self.df_apostas = None
+        self._group_stats_cache: Dict[str, pd.DataFrame] = {}
+        self._data_version = 0
+        self._patterns_version = None  # Versão dos dados já desenhada na aba de padrões
+        # Exportações e backups correm fora da thread da interface
+        self._io_pool = ThreadPoolExecutor(max_workers=2)
+        self._conn = None
+        self._conn_lock = threading.Lock()
         self.create_widgets()
         self.load_data()
+        
+        # Libertar o executor e a ligação com o ciclo de vida do widget
+        self.bind("<Destroy>", self._on_destroy)
     
     def create_widgets(self):
         """Criar widgets da análise"""
@@ -201,32 +303,109 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
             height=35
         ).pack(pady=10)
     
+    def _get_conn(self) -> sqlite3.Connection:
+        """Obter a ligação persistente à base de dados (criada na primeira utilização)"""
+        if self._conn is None:
+            # As exportações correm numa thread de trabalho, daí check_same_thread=False
+            self._conn = sqlite3.connect(self.db.db_path, check_same_thread=False)
+            self._conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA cache_size=-65536;
+                PRAGMA temp_store=MEMORY;
+            """)
+        return self._conn
+    
+    def _on_destroy(self, event=None):
+        """Parar o executor e fechar a ligação quando o widget é destruído"""
+        self._io_pool.shutdown(wait=False)
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
     def load_data(self):
         """Carregar dados para análise"""
         try:
-            conn = sqlite3.connect(self.db.db_path)
-            
-            # Carregar apostas
+            # Carregar apostas (conversões numéricas feitas pelo SQLite e datas durante a leitura)
             query = """
-                SELECT * FROM apostas
-                ORDER BY data_hora DESC
+                SELECT *,
+                       data_hora AS data,
+                       CAST(lucro_prejuizo AS REAL) AS lucro_numerico,
+                       CAST(odd AS REAL) AS odd_numerica,
+                       CAST(valor_apostado AS REAL) AS valor_numerico
+                FROM apostas
             """
             
-            self.df_apostas = pd.read_sql_query(query, conn)
-            conn.close()
+            read_options = {'dtype_backend': 'pyarrow'} if PYARROW_AVAILABLE else {}
+            with self._conn_lock:
+                self.df_apostas = pd.read_sql_query(
+                    query, self._get_conn(),
+                    parse_dates={'data': {'format': '%d/%m/%Y %H:%M', 'errors': 'coerce'}},
+                    **read_options
+                )
             
             # Processar dados
             if not self.df_apostas.empty:
-                self.df_apostas['data'] = pd.to_datetime(self.df_apostas['data_hora'])
-                self.df_apostas['lucro_numerico'] = pd.to_numeric(self.df_apostas['lucro_prejuizo'], errors='coerce')
-                self.df_apostas['odd_numerica'] = pd.to_numeric(self.df_apostas['odd'], errors='coerce')
-                self.df_apostas['valor_numerico'] = pd.to_numeric(self.df_apostas['valor_apostado'], errors='coerce')
+                # Ordem cronológica única para todas as análises (data_hora em texto não ordena no SQL)
+                self.df_apostas.sort_values('data', inplace=True, kind='mergesort')
+                self.df_apostas.reset_index(drop=True, inplace=True)
+                
+                # Os cálculos com numpy precisam de float64 nativo (nulos Arrow passam a NaN)
+                if PYARROW_AVAILABLE:
+                    for col in ('lucro_numerico', 'odd_numerica', 'valor_numerico'):
+                        self.df_apostas[col] = self.df_apostas[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                
+                # Colunas de agrupamento como categorias: o groupby trabalha sobre códigos inteiros
+                for col in ('competicao', 'tipo_aposta', 'resultado'):
+                    self.df_apostas[col] = self.df_apostas[col].astype('category')
+                
+                # Indicador de vitória: permite somar as vitórias com reduções nativas do groupby
+                self.df_apostas['ganha_flag'] = np.where(self.df_apostas['resultado'].values == 'Ganha', 1, 0).astype(np.int32)
+            
+            self._invalidate_caches()
             
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao carregar dados: {str(e)}")
     
+    def _invalidate_caches(self):
+        """Descartar as estatísticas agregadas do carregamento anterior"""
+        self._group_stats_cache = {}
+        self._data_version += 1
+    
+    def _count_wins(self) -> int:
+        """Número de apostas ganhas, sem filtrar o DataFrame"""
+        if 'ganha_flag' in self.df_apostas.columns:
+            return int(self.df_apostas['ganha_flag'].sum())
+        return int((self.df_apostas['resultado'].values == 'Ganha').sum())
+    
+    def _group_stats(self, key_col: str) -> pd.DataFrame:
+        """Estatísticas por grupo, calculadas uma única vez por carregamento de dados"""
+        stats = self._group_stats_cache.get(key_col)
+        if stats is None:
+            df = self.df_apostas
+            stats = _aggregate_by(
+                df[key_col], df['ganha_flag'].to_numpy(),
+                df['lucro_numerico'].to_numpy(), df['valor_numerico'].to_numpy()
+            ).round(2)
+            
+            # Divisões diretamente nos arrays; grupos sem volume ficam a 0
+            total = stats['Total'].to_numpy(dtype=np.float64)
+            apostado = stats['Apostado'].to_numpy(dtype=np.float64)
+            taxa = np.zeros(len(stats))
+            roi = np.zeros(len(stats))
+            np.divide(stats['Ganhas'].to_numpy(dtype=np.float64) * 100.0, total, out=taxa, where=total > 0)
+            np.divide(stats['Lucro'].to_numpy(dtype=np.float64) * 100.0, apostado, out=roi, where=apostado != 0)
+            stats['Taxa_Acerto'] = np.round(taxa, 1)
+            stats['ROI'] = np.round(roi, 1)
+            self._group_stats_cache[key_col] = stats
+        return stats
+    
     def analyze_patterns(self):
         """Analisar padrões nas apostas"""
+        # Os widgets atuais já mostram estes dados: nada a reconstruir
+        if self._patterns_version == self._data_version:
+            return
+        
         # Limpar conteúdo anterior
         for widget in self.patterns_content.winfo_children():
             widget.destroy()
@@ -256,6 +435,8 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
             # Análise de sequências
             self.analyze_sequences()
             
+            self._patterns_version = self._data_version
+            
         except Exception as e:
             ctk.CTkLabel(
                 self.patterns_content,
@@ -276,15 +457,7 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
         ).pack(pady=10)
         
         # Agrupar por competição
-        comp_stats = self.df_apostas.groupby('competicao').agg({
-            'resultado': ['count', lambda x: (x == 'Ganha').sum()],
-            'lucro_numerico': 'sum',
-            'valor_numerico': 'sum'
-        }).round(2)
-        
-        comp_stats.columns = ['Total', 'Ganhas', 'Lucro', 'Apostado']
-        comp_stats['Taxa_Acerto'] = (comp_stats['Ganhas'] / comp_stats['Total'] * 100).round(1)
-        comp_stats['ROI'] = (comp_stats['Lucro'] / comp_stats['Apostado'] * 100).round(1)
+        comp_stats = self._group_stats('competicao')
         
         # Mostrar top 5 competições
         top_comps = comp_stats.nlargest(5, 'ROI')
@@ -311,15 +484,7 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
         ).pack(pady=10)
         
         # Agrupar por tipo
-        type_stats = self.df_apostas.groupby('tipo_aposta').agg({
-            'resultado': ['count', lambda x: (x == 'Ganha').sum()],
-            'lucro_numerico': 'sum',
-            'valor_numerico': 'sum'
-        }).round(2)
-        
-        type_stats.columns = ['Total', 'Ganhas', 'Lucro', 'Apostado']
-        type_stats['Taxa_Acerto'] = (type_stats['Ganhas'] / type_stats['Total'] * 100).round(1)
-        type_stats['ROI'] = (type_stats['Lucro'] / type_stats['Apostado'] * 100).round(1)
+        type_stats = self._group_stats('tipo_aposta')
         
         for tipo, stats in type_stats.iterrows():
             color = "#00ff88" if stats['ROI'] > 0 else "#ff6b6b"
@@ -342,20 +507,11 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
             font=ctk.CTkFont(size=16, weight="bold")
         ).pack(pady=10)
         
-        # Criar faixas de odds
-        self.df_apostas['faixa_odd'] = pd.cut(
-            self.df_apostas['odd_numerica'],
-            bins=[0, 1.5, 2.0, 3.0, 5.0, float('inf')],
-            labels=['Muito Baixa (<1.5)', 'Baixa (1.5-2.0)', 'Média (2.0-3.0)', 'Alta (3.0-5.0)', 'Muito Alta (>5.0)']
-        )
-        
-        odds_stats = self.df_apostas.groupby('faixa_odd').agg({
-            'resultado': ['count', lambda x: (x == 'Ganha').sum()],
-            'lucro_numerico': 'sum'
-        }).round(2)
+        # Criar faixas de odds (códigos inteiros; os rótulos só entram no resultado agregado)
+        self.df_apostas['faixa_odd'] = _odd_band_codes(self.df_apostas['odd_numerica'].to_numpy(), _ODD_EDGES)
         
-        odds_stats.columns = ['Total', 'Ganhas', 'Lucro']
-        odds_stats['Taxa_Acerto'] = (odds_stats['Ganhas'] / odds_stats['Total'] * 100).round(1)
+        odds_stats = self._group_stats('faixa_odd')
+        odds_stats = odds_stats[odds_stats.index >= 0].rename(index=lambda code: _ODD_LABELS[code])
         
         for faixa, stats in odds_stats.iterrows():
             color = "#00ff88" if stats['Lucro'] > 0 else "#ff6b6b"
@@ -378,20 +534,14 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
             font=ctk.CTkFont(size=16, weight="bold")
         ).pack(pady=10)
         
-        # Análise por dia da semana
-        self.df_apostas['dia_semana'] = self.df_apostas['data'].dt.day_name()
-        
-        day_stats = self.df_apostas.groupby('dia_semana').agg({
-            'resultado': ['count', lambda x: (x == 'Ganha').sum()],
-            'lucro_numerico': 'sum'
-        }).round(2)
+        # Análise por dia da semana (agrupado pelo número do dia; os nomes só entram nas 7 linhas finais)
+        self.df_apostas['dia_semana'] = self.df_apostas['data'].dt.weekday
         
-        day_stats.columns = ['Total', 'Ganhas', 'Lucro']
-        day_stats['Taxa_Acerto'] = (day_stats['Ganhas'] / day_stats['Total'] * 100).round(1)
+        day_stats = self._group_stats('dia_semana')
         
-        # Ordenar por dias da semana
+        # O índice já vem ordenado por dia da semana (0 = segunda-feira)
         day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        day_stats = day_stats.reindex([day for day in day_order if day in day_stats.index])
+        day_stats = day_stats.rename(index=lambda day: day_order[int(day)])
         
         best_day = day_stats.loc[day_stats['Taxa_Acerto'].idxmax()]
         worst_day = day_stats.loc[day_stats['Taxa_Acerto'].idxmin()]
@@ -419,46 +569,22 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
             font=ctk.CTkFont(size=16, weight="bold")
         ).pack(pady=10)
         
-        # Calcular sequências
-        results = self.df_apostas.sort_values('data')['resultado'].tolist()
-        
-        win_sequences = []
-        loss_sequences = []
-        current_win_seq = 0
-        current_loss_seq = 0
-        
-        for result in results:
-            if result == 'Ganha':
-                current_win_seq += 1
-                if current_loss_seq > 0:
-                    loss_sequences.append(current_loss_seq)
-                    current_loss_seq = 0
-            elif result == 'Perdida':
-                current_loss_seq += 1
-                if current_win_seq > 0:
-                    win_sequences.append(current_win_seq)
-                    current_win_seq = 0
-        
-        # Adicionar sequência atual
-        if current_win_seq > 0:
-            win_sequences.append(current_win_seq)
-        if current_loss_seq > 0:
-            loss_sequences.append(current_loss_seq)
-        
-        if win_sequences:
-            max_win_seq = max(win_sequences)
-            avg_win_seq = np.mean(win_sequences)
-            
+        # Calcular sequências (apostas pendentes não interrompem sequências)
+        results = self.df_apostas['resultado'].to_numpy()
+        if NUMBA_AVAILABLE:
+            codes = np.where(results == 'Ganha', 1, np.where(results == 'Perdida', 0, -1)).astype(np.int8)
+            max_win_seq, avg_win_seq, max_loss_seq, avg_loss_seq = _streaks(codes)
+        else:
+            max_win_seq, avg_win_seq, max_loss_seq, avg_loss_seq = _streaks_numpy(results)
+        
+        if max_win_seq:
             ctk.CTkLabel(
                 seq_frame,
                 text=f"🏆 Maior sequência de vitórias: {max_win_seq} (média: {avg_win_seq:.1f})",
                 text_color="#00ff88"
             ).pack(anchor="w", padx=20, pady=2)
         
-        if loss_sequences:
-            max_loss_seq = max(loss_sequences)
-            avg_loss_seq = np.mean(loss_sequences)
-            
+        if max_loss_seq:
             ctk.CTkLabel(
                 seq_frame,
                 text=f"❌ Maior sequência de derrotas: {max_loss_seq} (média: {avg_loss_seq:.1f})",
@@ -469,6 +595,19 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
     
     # Função make_prediction removida conforme solicitado
     
+    def _run_in_background(self, func, *args, error_message: str):
+        """Executar uma exportação numa thread de trabalho e mostrar o resultado na thread da interface"""
+        future = self._io_pool.submit(func, *args)
+        future.add_done_callback(lambda f: self.after(0, self._notify, f, error_message))
+    
+    def _notify(self, future, error_message: str):
+        """Mostrar o resultado de uma tarefa em background"""
+        error = future.exception()
+        if error is None:
+            messagebox.showinfo("Sucesso", future.result())
+        else:
+            messagebox.showerror("Erro", f"{error_message}: {str(error)}")
+    
     def export_pdf(self):
         """Exportar relatório em PDF"""
         if not PDF_AVAILABLE:
@@ -486,72 +625,82 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
             if not filename:
                 return
             
-            # Criar PDF
-            doc = SimpleDocTemplate(filename, pagesize=A4)
-            story = []
-            styles = getSampleStyleSheet()
-            
-            # Título
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                spaceAfter=30,
-                alignment=1  # Center
-            )
-            
-            story.append(Paragraph("📊 Relatório de Apostas Desportivas", title_style))
-            story.append(Spacer(1, 20))
-            
-            # Período
+            # Ler a interface aqui; a construção do PDF corre em background
             period = self.period_combo.get()
-            story.append(Paragraph(f"Período: {period}", styles['Normal']))
-            story.append(Paragraph(f"Data de Geração: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # Estatísticas gerais
-            if not self.df_apostas.empty:
-                total_apostas = len(self.df_apostas)
-                apostas_ganhas = len(self.df_apostas[self.df_apostas['resultado'] == 'Ganha'])
-                taxa_acerto = (apostas_ganhas / total_apostas * 100) if total_apostas > 0 else 0
-                lucro_total = self.df_apostas['lucro_numerico'].sum()
-                valor_total = self.df_apostas['valor_numerico'].sum()
-                roi = (lucro_total / valor_total * 100) if valor_total > 0 else 0
-                
-                stats_data = [
-                    ['Métrica', 'Valor'],
-                    ['Total de Apostas', str(total_apostas)],
-                    ['Apostas Ganhas', str(apostas_ganhas)],
-                    ['Taxa de Acerto', f"{taxa_acerto:.1f}%"],
-                    ['Lucro Total', f"€{lucro_total:.2f}"],
-                    ['Valor Total Apostado', f"€{valor_total:.2f}"],
-                    ['ROI', f"{roi:.1f}%"]
-                ]
-                
-                stats_table = Table(stats_data)
-                stats_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 14),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                
-                story.append(Paragraph("📈 Estatísticas Gerais", styles['Heading2']))
-                story.append(stats_table)
-                story.append(Spacer(1, 20))
-            
-            # Construir PDF
-            doc.build(story)
-            
-            messagebox.showinfo("Sucesso", f"Relatório PDF exportado com sucesso!\n{filename}")
+            self._run_in_background(self._do_export_pdf, filename, period, error_message="Erro ao exportar PDF")
             
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao exportar PDF: {str(e)}")
     
+    def _do_export_pdf(self, filename: str, period: str) -> str:
+        """Construir o relatório PDF (thread de trabalho)"""
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib import colors
+        
+        # Criar PDF
+        doc = SimpleDocTemplate(filename, pagesize=A4)
+        story = []
+        styles = getSampleStyleSheet()
+        
+        # Título
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=1  # Center
+        )
+        
+        story.append(Paragraph("📊 Relatório de Apostas Desportivas", title_style))
+        story.append(Spacer(1, 20))
+        
+        # Período
+        story.append(Paragraph(f"Período: {period}", styles['Normal']))
+        story.append(Paragraph(f"Data de Geração: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
+        story.append(Spacer(1, 20))
+        
+        # Estatísticas gerais
+        if not self.df_apostas.empty:
+            total_apostas = len(self.df_apostas)
+            apostas_ganhas = self._count_wins()
+            taxa_acerto = (apostas_ganhas / total_apostas * 100) if total_apostas > 0 else 0
+            lucro_total = self.df_apostas['lucro_numerico'].sum()
+            valor_total = self.df_apostas['valor_numerico'].sum()
+            roi = (lucro_total / valor_total * 100) if valor_total > 0 else 0
+            
+            stats_data = [
+                ['Métrica', 'Valor'],
+                ['Total de Apostas', str(total_apostas)],
+                ['Apostas Ganhas', str(apostas_ganhas)],
+                ['Taxa de Acerto', f"{taxa_acerto:.1f}%"],
+                ['Lucro Total', f"€{lucro_total:.2f}"],
+                ['Valor Total Apostado', f"€{valor_total:.2f}"],
+                ['ROI', f"{roi:.1f}%"]
+            ]
+            
+            stats_table = Table(stats_data)
+            stats_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 14),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black)
+            ]))
+            
+            story.append(Paragraph("📈 Estatísticas Gerais", styles['Heading2']))
+            story.append(stats_table)
+            story.append(Spacer(1, 20))
+        
+        # Construir PDF
+        doc.build(story)
+        
+        return f"Relatório PDF exportado com sucesso!\n{filename}"
+    
     def export_excel(self):
         """Exportar dados para Excel"""
         try:
@@ -564,56 +713,65 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
             if not filename:
                 return
             
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                # Apostas
-                if not self.df_apostas.empty:
-                    self.df_apostas.to_excel(writer, sheet_name='Apostas', index=False)
-                
-                # Estatísticas por competição
-                if not self.df_apostas.empty:
-                    comp_stats = self.df_apostas.groupby('competicao').agg({
-                        'resultado': ['count', lambda x: (x == 'Ganha').sum()],
-                        'lucro_numerico': 'sum',
-                        'valor_numerico': 'sum'
-                    }).round(2)
-                    
-                    comp_stats.columns = ['Total', 'Ganhas', 'Lucro', 'Apostado']
-                    comp_stats['Taxa_Acerto'] = (comp_stats['Ganhas'] / comp_stats['Total'] * 100).round(1)
-                    comp_stats['ROI'] = (comp_stats['Lucro'] / comp_stats['Apostado'] * 100).round(1)
-                    
-                    comp_stats.to_excel(writer, sheet_name='Por_Competicao')
-                
-                # Histórico de banca
-                conn = sqlite3.connect(self.db.db_path)
-                df_banca = pd.read_sql_query("SELECT * FROM historico_banca ORDER BY created_at", conn)
-                conn.close()
-                
-                if not df_banca.empty:
-                    df_banca.to_excel(writer, sheet_name='Historico_Banca', index=False)
-            
-            messagebox.showinfo("Sucesso", f"Dados exportados com sucesso!\n{filename}")
+            self._run_in_background(self._do_export_excel, filename, error_message="Erro ao exportar Excel")
             
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao exportar Excel: {str(e)}")
     
+    def _do_export_excel(self, filename: str) -> str:
+        """Escrever o ficheiro Excel (thread de trabalho)"""
+        engine = 'xlsxwriter' if XLSXWRITER_AVAILABLE else 'openpyxl'
+        with pd.ExcelWriter(filename, engine=engine) as writer:
+            # Apostas (escritas em blocos para limitar a memória da formatação das células)
+            if not self.df_apostas.empty:
+                # df_apostas está em ordem cronológica; a folha mantém as mais recentes primeiro
+                df_export = self.df_apostas.drop(columns=_HELPER_COLUMNS, errors='ignore').iloc[::-1]
+                for start in range(0, len(df_export), _EXCEL_CHUNK_ROWS):
+                    df_export.iloc[start:start + _EXCEL_CHUNK_ROWS].to_excel(
+                        writer,
+                        sheet_name='Apostas',
+                        startrow=start + 1 if start else 0,
+                        header=start == 0,
+                        index=False
+                    )
+            
+            # Estatísticas por competição
+            if not self.df_apostas.empty:
+                comp_stats = self._group_stats('competicao')
+                comp_stats.to_excel(writer, sheet_name='Por_Competicao')
+            
+            # Histórico de banca
+            with self._conn_lock:
+                df_banca = pd.read_sql_query("SELECT * FROM historico_banca ORDER BY created_at", self._get_conn())
+            
+            if not df_banca.empty:
+                df_banca.to_excel(writer, sheet_name='Historico_Banca', index=False)
+        
+        return f"Dados exportados com sucesso!\n{filename}"
+    
     def create_backup(self):
         """Criar backup completo"""
+        self._run_in_background(self._do_create_backup, error_message="Erro ao criar backup")
+    
+    def _do_create_backup(self) -> str:
+        """Copiar a base de dados (thread de trabalho)"""
+        # Criar pasta de backup
+        backup_dir = Path("backups")
+        backup_dir.mkdir(exist_ok=True)
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        backup_file = backup_dir / f"backup_completo_{timestamp}.db"
+        
+        # Copiar base de dados com a API de backup do SQLite (cópia consistente, mesmo com escritas pendentes)
+        src = sqlite3.connect(self.db.db_path)
+        dst = sqlite3.connect(str(backup_file))
         try:
-            # Criar pasta de backup
-            backup_dir = Path("backups")
-            backup_dir.mkdir(exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = backup_dir / f"backup_completo_{timestamp}.db"
-            
-            # Copiar base de dados
-            import shutil
-            shutil.copy2(self.db.db_path, backup_file)
-            
-            messagebox.showinfo("Sucesso", f"Backup criado com sucesso!\n{backup_file}")
-            
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao criar backup: {str(e)}")
+            src.backup(dst, pages=1024)
+        finally:
+            dst.close()
+            src.close()
+        
+        return f"Backup criado com sucesso!\n{backup_file}"
     
     def generate_suggestions(self):
         """Gerar sugestões baseadas nos dados"""
@@ -624,52 +782,47 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
             return
         
         try:
-            suggestions = []
+            suggestions = io.StringIO()
             
             # Análise de performance geral
             total_apostas = len(self.df_apostas)
-            apostas_ganhas = len(self.df_apostas[self.df_apostas['resultado'] == 'Ganha'])
+            apostas_ganhas = self._count_wins()
             taxa_acerto = (apostas_ganhas / total_apostas * 100) if total_apostas > 0 else 0
             
-            suggestions.append("🔮 SUGESTÕES PERSONALIZADAS\n" + "="*50)
+            suggestions.write(f"🔮 SUGESTÕES PERSONALIZADAS\n{'=' * 50}\n")
             
             # Sugestões baseadas na taxa de acerto
             if taxa_acerto < 40:
-                suggestions.append("\n⚠️ ALERTA: Taxa de acerto baixa ({:.1f}%)".format(taxa_acerto))
-                suggestions.append("💡 Sugestões:")
-                suggestions.append("   • Reduza o valor das apostas temporariamente")
-                suggestions.append("   • Foque em odds mais baixas (1.5-2.5)")
-                suggestions.append("   • Analise melhor os jogos antes de apostar")
+                suggestions.write(f"\n⚠️ ALERTA: Taxa de acerto baixa ({taxa_acerto:.1f}%)\n")
+                suggestions.write("💡 Sugestões:\n")
+                suggestions.write("   • Reduza o valor das apostas temporariamente\n")
+                suggestions.write("   • Foque em odds mais baixas (1.5-2.5)\n")
+                suggestions.write("   • Analise melhor os jogos antes de apostar\n")
             elif taxa_acerto > 60:
-                suggestions.append("\n🏆 EXCELENTE: Taxa de acerto alta ({:.1f}%)".format(taxa_acerto))
-                suggestions.append("💡 Sugestões:")
-                suggestions.append("   • Considere aumentar gradualmente o valor das apostas")
-                suggestions.append("   • Mantenha a estratégia atual")
-                suggestions.append("   • Explore apostas com odds ligeiramente mais altas")
+                suggestions.write(f"\n🏆 EXCELENTE: Taxa de acerto alta ({taxa_acerto:.1f}%)\n")
+                suggestions.write("💡 Sugestões:\n")
+                suggestions.write("   • Considere aumentar gradualmente o valor das apostas\n")
+                suggestions.write("   • Mantenha a estratégia atual\n")
+                suggestions.write("   • Explore apostas com odds ligeiramente mais altas\n")
             
             # Análise de competições
             if not self.df_apostas.empty:
-                comp_stats = self.df_apostas.groupby('competicao').agg({
-                    'resultado': ['count', lambda x: (x == 'Ganha').sum()],
-                    'lucro_numerico': 'sum'
-                }).round(2)
-                
-                comp_stats.columns = ['Total', 'Ganhas', 'Lucro']
-                comp_stats['Taxa_Acerto'] = (comp_stats['Ganhas'] / comp_stats['Total'] * 100).round(1)
+                comp_stats = self._group_stats('competicao')
+                comp_stats = comp_stats[comp_stats['Total'] >= 3]
                 
                 # Melhores competições
-                best_comps = comp_stats[comp_stats['Total'] >= 3].nlargest(3, 'Taxa_Acerto')
+                best_comps = comp_stats.nlargest(3, 'Taxa_Acerto')
                 if not best_comps.empty:
-                    suggestions.append("\n🏆 COMPETIÇÕES RECOMENDADAS:")
+                    suggestions.write("\n🏆 COMPETIÇÕES RECOMENDADAS:\n")
                     for comp, stats in best_comps.iterrows():
-                        suggestions.append(f"   • {comp}: {stats['Taxa_Acerto']:.1f}% acerto")
+                        suggestions.write(f"   • {comp}: {stats['Taxa_Acerto']:.1f}% acerto\n")
                 
                 # Piores competições
-                worst_comps = comp_stats[comp_stats['Total'] >= 3].nsmallest(2, 'Taxa_Acerto')
+                worst_comps = comp_stats.nsmallest(2, 'Taxa_Acerto')
                 if not worst_comps.empty:
-                    suggestions.append("\n⚠️ COMPETIÇÕES A EVITAR:")
+                    suggestions.write("\n⚠️ COMPETIÇÕES A EVITAR:\n")
                     for comp, stats in worst_comps.iterrows():
-                        suggestions.append(f"   • {comp}: {stats['Taxa_Acerto']:.1f}% acerto")
+                        suggestions.write(f"   • {comp}: {stats['Taxa_Acerto']:.1f}% acerto\n")
             
             # Análise de gestão de banca
             saldo_atual = self.db.get_saldo_atual()
@@ -679,45 +832,40 @@ class AnaliseFrame(ctk.CTkScrollableFrame):
             if saldo_inicial > 0:
                 variacao_percent = ((saldo_atual - saldo_inicial) / saldo_inicial * 100)
                 
-                suggestions.append("\n💰 GESTÃO DE BANCA:")
+                suggestions.write("\n💰 GESTÃO DE BANCA:\n")
                 if variacao_percent < -20:
-                    suggestions.append("   ⚠️ ALERTA: Perda significativa da banca ({:.1f}%)".format(variacao_percent))
-                    suggestions.append("   💡 Reduza drasticamente o valor das apostas")
-                    suggestions.append("   💡 Considere uma pausa para reavaliar a estratégia")
+                    suggestions.write(f"   ⚠️ ALERTA: Perda significativa da banca ({variacao_percent:.1f}%)\n")
+                    suggestions.write("   💡 Reduza drasticamente o valor das apostas\n")
+                    suggestions.write("   💡 Considere uma pausa para reavaliar a estratégia\n")
                 elif variacao_percent > 20:
-                    suggestions.append("   🏆 EXCELENTE: Crescimento da banca ({:.1f}%)".format(variacao_percent))
-                    suggestions.append("   💡 Mantenha a disciplina atual")
-                    suggestions.append("   💡 Considere retirar parte dos lucros")
+                    suggestions.write(f"   🏆 EXCELENTE: Crescimento da banca ({variacao_percent:.1f}%)\n")
+                    suggestions.write("   💡 Mantenha a disciplina atual\n")
+                    suggestions.write("   💡 Considere retirar parte dos lucros\n")
             
             # Análise de odds
             if 'odd_numerica' in self.df_apostas.columns:
-                odds_stats = self.df_apostas.groupby(
-                    pd.cut(self.df_apostas['odd_numerica'], 
-                          bins=[0, 1.8, 2.5, 4.0, float('inf')],
-                          labels=['Baixa', 'Média', 'Alta', 'Muito Alta'])
-                ).agg({
-                    'resultado': ['count', lambda x: (x == 'Ganha').sum()]
-                }).round(2)
-                
-                odds_stats.columns = ['Total', 'Ganhas']
-                odds_stats['Taxa_Acerto'] = (odds_stats['Ganhas'] / odds_stats['Total'] * 100).round(1)
+                if 'faixa_odd_sugestao' not in self.df_apostas.columns:
+                    self.df_apostas['faixa_odd_sugestao'] = _odd_band_codes(
+                        self.df_apostas['odd_numerica'].to_numpy(), _SUGGESTION_ODD_EDGES)
+                odds_stats = self._group_stats('faixa_odd_sugestao')
+                odds_stats = odds_stats[odds_stats.index >= 0].rename(index=lambda code: _SUGGESTION_ODD_LABELS[code])
                 
                 best_odds_range = odds_stats.loc[odds_stats['Taxa_Acerto'].idxmax()]
                 
-                suggestions.append("\n📈 ANÁLISE DE ODDS:")
-                suggestions.append(f"   🎯 Melhor faixa: {best_odds_range.name} ({best_odds_range['Taxa_Acerto']:.1f}% acerto)")
-                suggestions.append(f"   💡 Foque mais em apostas nesta faixa de odds")
+                suggestions.write("\n📈 ANÁLISE DE ODDS:\n")
+                suggestions.write(f"   🎯 Melhor faixa: {best_odds_range.name} ({best_odds_range['Taxa_Acerto']:.1f}% acerto)\n")
+                suggestions.write(f"   💡 Foque mais em apostas nesta faixa de odds\n")
             
             # Sugestões gerais
-            suggestions.append("\n💡 DICAS GERAIS:")
-            suggestions.append("   • Nunca aposte mais de 5% da banca numa única aposta")
-            suggestions.append("   • Mantenha registos detalhados de todas as apostas")
-            suggestions.append("   • Analise os padrões regularmente")
-            suggestions.append("   • Defina limites de perda diários/semanais")
-            suggestions.append("   • Aposte apenas quando tiver convicção")
+            suggestions.write("\n💡 DICAS GERAIS:\n")
+            suggestions.write("   • Nunca aposte mais de 5% da banca numa única aposta\n")
+            suggestions.write("   • Mantenha registos detalhados de todas as apostas\n")
+            suggestions.write("   • Analise os padrões regularmente\n")
+            suggestions.write("   • Defina limites de perda diários/semanais\n")
+            suggestions.write("   • Aposte apenas quando tiver convicção\n")
             
             # Mostrar sugestões
-            self.suggestions_text.insert("end", "\n".join(suggestions))
+            self.suggestions_text.insert("end", suggestions.getvalue())
             
         except Exception as e:
             self.suggestions_text.insert("end", f"❌ Erro ao gerar sugestões: {str(e)}")
\ No newline at end of file
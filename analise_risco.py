@@ -10,36 +10,245 @@ import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 import sqlite3
+import bisect
+from functools import wraps
 from main import DatabaseManager
-from scipy import stats
 import warnings
 warnings.filterwarnings('ignore')
 
+# Compilação JIT da simulação Monte Carlo (opcional)
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, boundscheck=False, cache=True)
+    def _mc_kernel(outcomes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Retorno final e drawdown máximo de cada simulação (uma linha de resultados por simulação)"""
+        num_simulations, num_bets = outcomes.shape
+        final_returns = np.empty(num_simulations)
+        max_drawdowns = np.empty(num_simulations)
+        
+        for s in prange(num_simulations):
+            cumulative_return = 0.0
+            max_drawdown = 0.0
+            peak = 0.0
+            
+            for i in range(num_bets):
+                cumulative_return += outcomes[s, i]
+                
+                # Calcular drawdown
+                if cumulative_return > peak:
+                    peak = cumulative_return
+                elif peak - cumulative_return > max_drawdown:
+                    max_drawdown = peak - cumulative_return
+            
+            final_returns[s] = cumulative_return
+            max_drawdowns[s] = max_drawdown
+        
+        return final_returns, max_drawdowns
+else:
+    def _mc_kernel(outcomes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Retorno final e drawdown máximo de cada simulação (uma linha de resultados por simulação)"""
+        cumulative = np.cumsum(outcomes, axis=1)
+        peak = np.maximum.accumulate(np.maximum(cumulative, 0.0), axis=1)  # O pico parte de 0
+        return outcomes.sum(axis=1), (peak - cumulative).max(axis=1, initial=0.0)
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _drawdown_and_min(returns: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Drawdown de cada aposta e o mínimo, numa única passagem (pico acumulado como recorrência)"""
+        drawdown = np.empty_like(returns)
+        cumulative = 0.0
+        peak = -np.inf
+        min_drawdown = 0.0
+        has_nan = False
+        for i in range(returns.size):
+            cumulative += returns[i]
+            if cumulative > peak:
+                peak = cumulative
+            drawdown[i] = cumulative - peak
+            if drawdown[i] < min_drawdown:
+                min_drawdown = drawdown[i]
+            elif np.isnan(drawdown[i]):
+                has_nan = True
+        # Como np.min: um retorno não finito (ex.: valor apostado 0) propaga NaN
+        return drawdown, np.nan if has_nan else min_drawdown
+    
+    @njit(cache=True)
+    def _min_drawdown(returns: np.ndarray) -> float:
+        """Drawdown mínimo sem alocar a série de drawdowns"""
+        cumulative = 0.0
+        peak = -np.inf
+        min_drawdown = 0.0
+        has_nan = False
+        for i in range(returns.size):
+            cumulative += returns[i]
+            if cumulative > peak:
+                peak = cumulative
+            if cumulative - peak < min_drawdown:
+                min_drawdown = cumulative - peak
+            elif np.isnan(cumulative - peak):
+                has_nan = True
+        return np.nan if has_nan else min_drawdown
+    
+    @njit(cache=True)
+    def _windowed_min_drawdown(returns: np.ndarray, lookback: int) -> float:
+        """Drawdown mínimo face ao pico das últimas lookback apostas (deque monotónica, O(N))"""
+        cumulative = np.cumsum(returns)
+        window = np.empty(returns.size, dtype=np.int64)  # Índices com valores decrescentes
+        head = 0
+        tail = 0
+        min_drawdown = 0.0
+        for i in range(returns.size):
+            if np.isnan(cumulative[i]):
+                return np.nan  # Retorno não finito: NaN, como no caminho numpy
+            while tail > head and cumulative[window[tail - 1]] <= cumulative[i]:
+                tail -= 1
+            window[tail] = i
+            tail += 1
+            if window[head] < i - lookback:
+                head += 1
+            if cumulative[i] - cumulative[window[head]] < min_drawdown:
+                min_drawdown = cumulative[i] - cumulative[window[head]]
+            elif np.isnan(cumulative[i] - cumulative[window[head]]):
+                return np.nan
+        return min_drawdown
+else:
+    def _drawdown_and_min(returns: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Drawdown de cada aposta e o mínimo"""
+        cumulative = np.cumsum(returns)
+        drawdown = cumulative - np.maximum.accumulate(cumulative)
+        return drawdown, np.min(drawdown)
+    
+    def _min_drawdown(returns: np.ndarray) -> float:
+        """Drawdown mínimo"""
+        return _drawdown_and_min(returns)[1]
+    
+    def _windowed_min_drawdown(returns: np.ndarray, lookback: int) -> float:
+        """Drawdown mínimo face ao pico das últimas lookback apostas (máximo móvel do pandas, O(N))"""
+        cumulative = np.cumsum(returns)
+        if np.isfinite(cumulative).all():
+            peak = pd.Series(cumulative).rolling(lookback + 1, min_periods=1).max().to_numpy()
+        else:
+            # O rolling do pandas trata inf como NaN e ignora-os; com retornos não finitos
+            # usa-se a janela explícita para que inf/NaN se propaguem como no caminho numba
+            padded = np.concatenate((np.full(lookback, -np.inf), cumulative))
+            peak = np.lib.stride_tricks.sliding_window_view(padded, lookback + 1).max(axis=1)
+        return np.minimum(0.0, np.min(cumulative - peak))
+
+def _memoize_by_df(method):
+    """Reutilizar o resultado enquanto os dados carregados não mudarem"""
+    @wraps(method)
+    def wrapper(self):
+        key = self._data_key()
+        if key is None:
+            return method(self)
+        
+        cached = self._cache.get(method.__name__)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        value = method(self)
+        self._cache[method.__name__] = (key, value)
+        return value
+    return wrapper
+
+def _quantile_select(values: np.ndarray, q: float) -> float:
+    """Quantil com interpolação linear (como np.percentile) por seleção O(N), sem ordenar"""
+    if not np.isfinite(values).all():
+        # np.partition ordena NaN no fim e não reproduz a propagação de NaN/inf do np.percentile
+        return np.percentile(values, q * 100)
+    pos = q * (values.size - 1)
+    lo = int(np.floor(pos))
+    hi = min(lo + 1, values.size - 1)
+    part = np.partition(values, (lo, hi))
+    return part[lo] + (part[hi] - part[lo]) * (pos - lo)
+
+def _kelly_fraction(win_rate, avg_win, avg_loss):
+    """Kelly Criterion vetorizado (win_rate em %), limitado a [0, 25%]; 0 sem perda média"""
+    avg_loss = np.abs(np.asarray(avg_loss, dtype=np.float64))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        b = np.asarray(avg_win, dtype=np.float64) / np.where(avg_loss != 0, avg_loss, np.nan)  # Ratio win/loss
+        p = np.asarray(win_rate, dtype=np.float64) / 100  # Probabilidade de ganhar
+        kelly = (b * p - (1 - p)) / b
+    
+    # Limitar a 25% para segurança (sem rácio válido não se aposta)
+    return np.clip(np.nan_to_num(kelly, nan=0.0, neginf=0.0), 0.0, 0.25)
+
 class RiskAnalyzer:
     """Analisador de risco para apostas desportivas"""
     
+    # Recomendações por nível: score <= 40, <= 60, <= 80 e acima
+    _RISK_THRESHOLDS = (40, 60, 80)
+    _RISK_RECOMMENDATIONS = (
+        (
+            "✅ Risco controlado",
+            "Continue com a estratégia atual",
+            "Monitore regularmente as métricas",
+            "Considere aumentar gradualmente as posições"
+        ),
+        (
+            "📊 Risco moderado",
+            "Mantenha disciplina na gestão de banca",
+            "Continue monitorando as métricas",
+            "Considere otimizar com Kelly Criterion"
+        ),
+        (
+            "⚡ Risco elevado",
+            "Reduza o tamanho das apostas",
+            "Diversifique mais suas apostas",
+            "Monitore o drawdown de perto",
+            "Considere estratégias mais conservadoras"
+        ),
+        (
+            "⚠️ Risco muito alto detectado",
+            "Reduza significativamente o tamanho das apostas",
+            "Revise sua estratégia de apostas",
+            "Considere fazer uma pausa para análise",
+            "Implemente stop-loss rigoroso"
+        )
+    )
+    
     def __init__(self, db: DatabaseManager):
         self.db = db
         self.df_apostas = None
+        self._cache: Dict[str, Tuple[tuple, object]] = {}
         self.load_data()
     
     def load_data(self):
         """Carregar dados das apostas"""
+        self._set_arrays(None)
         try:
+            # Apenas as colunas usadas, construídas coluna a coluna sem o adaptador SQL do pandas
             conn = sqlite3.connect(self.db.db_path)
-            self.df_apostas = pd.read_sql_query("""
-                SELECT * FROM apostas 
+            rows = conn.execute("""
+                SELECT data_hora, lucro_prejuizo, valor_apostado, resultado, competicao, tipo_aposta
+                FROM apostas 
                 WHERE resultado IN ('Ganha', 'Perdida')
                 ORDER BY data_hora
-            """, conn)
+            """).fetchall()
             conn.close()
             
+            cols = list(zip(*rows)) if rows else [()] * 6
+            self.df_apostas = pd.DataFrame({
+                'data_hora': np.array(cols[0], dtype=object),
+                'lucro_prejuizo': np.array(cols[1], dtype=np.float64),
+                'valor_apostado': np.array(cols[2], dtype=np.float64),
+                'resultado': np.array(cols[3], dtype=object),
+                'competicao': np.array(cols[4], dtype=object),
+                'tipo_aposta': np.array(cols[5], dtype=object)
+            })
+            
             if not self.df_apostas.empty:
                 # Converter data_hora para datetime
                 self.df_apostas['data_hora'] = pd.to_datetime(
                     self.df_apostas['data_hora'], 
                     format='%d/%m/%Y %H:%M',
-                    dayfirst=True,
+                    exact=True,
+                    cache=True,
                     errors='coerce'
                 )
                 
@@ -50,49 +259,101 @@ class RiskAnalyzer:
                 # Adicionar resultado binário
                 self.df_apostas['win'] = (self.df_apostas['resultado'] == 'Ganha').astype(int)
                 
+                self._set_arrays(self.df_apostas)
+                
         except Exception as e:
             print(f"Erro ao carregar dados: {e}")
+        
+        # Estado validado uma vez por carregamento, em vez de em cada método
+        self._has_data = self.df_apostas is not None and not self.df_apostas.empty
+        self._cache = {}
+    
+    def _set_arrays(self, df: Optional[pd.DataFrame]):
+        """Guardar as colunas usadas nos cálculos como arrays numpy contíguos"""
+        if df is None:
+            self._return = np.empty(0)
+            self._pl = np.empty(0)
+            self._win = np.empty(0, dtype=np.int8)
+            self._comp_codes, self._comp_uniques = np.empty(0, dtype=np.intp), np.empty(0, dtype=object)
+            self._tipo_codes, self._tipo_uniques = np.empty(0, dtype=np.intp), np.empty(0, dtype=object)
+            return
+        
+        self._return = df['return'].to_numpy(dtype=np.float64)
+        self._pl = df['lucro_prejuizo'].to_numpy(dtype=np.float64)
+        self._win = df['win'].to_numpy(dtype=np.int8)
+        self._comp_codes, self._comp_uniques = pd.factorize(df['competicao'])
+        self._tipo_codes, self._tipo_uniques = pd.factorize(df['tipo_aposta'])
+    
+    def _data_key(self) -> Optional[tuple]:
+        """Impressão digital barata dos dados carregados (None se não houver dados)"""
+        if not self._has_data:
+            return None
+        
+        last = self.df_apostas.iloc[-1]
+        return (len(self.df_apostas), str(last['data_hora']), float(last['lucro_prejuizo']))
     
+    @_memoize_by_df
     def calculate_basic_metrics(self) -> Dict[str, float]:
         """Calcular métricas básicas de risco"""
-        if self.df_apostas is None or self.df_apostas.empty:
+        if not self._has_data:
             return {}
         
-        returns = self.df_apostas['return'].values
+        returns = self._return
+        
+        # Momentos calculados uma vez e partilhados pelos rácios
+        mean = returns.mean()
+        deviations = returns - mean
+        sq_deviations = deviations * deviations
+        m2 = sq_deviations.mean()
+        m3 = (sq_deviations * deviations).mean()
+        m4 = (sq_deviations * sq_deviations).mean()
+        std = np.sqrt(m2)
+        max_dd = self.calculate_max_drawdown(returns)
         
         metrics = {
             'total_bets': len(self.df_apostas),
-            'win_rate': self.df_apostas['win'].mean() * 100,
-            'avg_return': np.mean(returns) * 100,
-            'volatility': np.std(returns) * 100,
-            'sharpe_ratio': self.calculate_sharpe_ratio(returns),
-            'sortino_ratio': self.calculate_sortino_ratio(returns),
-            'calmar_ratio': self.calculate_calmar_ratio(returns),
-            'max_drawdown': self.calculate_max_drawdown(returns),
+            'win_rate': self._win.mean() * 100,
+            'avg_return': mean * 100,
+            'volatility': std * 100,
+            'sharpe_ratio': self.calculate_sharpe_ratio(returns, mean=mean, std=std),
+            'sortino_ratio': self.calculate_sortino_ratio(returns, mean=mean),
+            'calmar_ratio': self.calculate_calmar_ratio(returns, max_dd, mean=mean),
+            'max_drawdown': max_dd,
             'var_95': self.calculate_var(returns, 0.95),
             'var_99': self.calculate_var(returns, 0.99),
             'cvar_95': self.calculate_cvar(returns, 0.95),
-            'skewness': stats.skew(returns),
-            'kurtosis': stats.kurtosis(returns),
+            'skewness': m3 / m2 ** 1.5 if m2 > 0 else np.nan,
+            'kurtosis': m4 / (m2 * m2) - 3 if m2 > 0 else np.nan,
             'profit_factor': self.calculate_profit_factor()
         }
         
         return metrics
     
-    def calculate_sharpe_ratio(self, returns: np.ndarray, risk_free_rate: float = 0.0) -> float:
-        """Calcular Sharpe Ratio"""
-        if len(returns) == 0 or np.std(returns) == 0:
+    def calculate_sharpe_ratio(self, returns: np.ndarray, risk_free_rate: float = 0.0,
+                               mean: Optional[float] = None, std: Optional[float] = None) -> float:
+        """Calcular Sharpe Ratio (mean/std opcionais, se já calculados)"""
+        if len(returns) == 0:
+            return 0.0
+        
+        if std is None:
+            std = np.std(returns)
+        if std == 0:
             return 0.0
         
-        excess_return = np.mean(returns) - risk_free_rate
-        return excess_return / np.std(returns)
+        if mean is None:
+            mean = np.mean(returns)
+        excess_return = mean - risk_free_rate
+        return excess_return / std
     
-    def calculate_sortino_ratio(self, returns: np.ndarray, risk_free_rate: float = 0.0) -> float:
+    def calculate_sortino_ratio(self, returns: np.ndarray, risk_free_rate: float = 0.0,
+                                mean: Optional[float] = None) -> float:
         """Calcular Sortino Ratio (considera apenas volatilidade negativa)"""
         if len(returns) == 0:
             return 0.0
         
-        excess_return = np.mean(returns) - risk_free_rate
+        if mean is None:
+            mean = np.mean(returns)
+        excess_return = mean - risk_free_rate
         downside_returns = returns[returns < risk_free_rate]
         
         if len(downside_returns) == 0:
@@ -101,112 +362,81 @@ class RiskAnalyzer:
         downside_deviation = np.std(downside_returns)
         return excess_return / downside_deviation if downside_deviation > 0 else 0.0
     
-    def calculate_calmar_ratio(self, returns: np.ndarray) -> float:
+    def calculate_calmar_ratio(self, returns: np.ndarray, max_drawdown: Optional[float] = None,
+                               mean: Optional[float] = None) -> float:
         """Calcular Calmar Ratio (retorno anualizado / max drawdown)"""
         if len(returns) == 0:
             return 0.0
         
-        annual_return = np.mean(returns) * 252  # Assumindo 252 dias de trading por ano
-        max_dd = abs(self.calculate_max_drawdown(returns))
+        if mean is None:
+            mean = np.mean(returns)
+        annual_return = mean * 252  # Assumindo 252 dias de trading por ano
+        if max_drawdown is None:
+            max_drawdown = self.calculate_max_drawdown(returns)
+        max_dd = abs(max_drawdown)
         
         return annual_return / max_dd if max_dd > 0 else 0.0
     
-    def calculate_max_drawdown(self, returns: np.ndarray) -> float:
-        """Calcular Maximum Drawdown"""
+    def calculate_max_drawdown(self, returns: np.ndarray, drawdown_lookback: Optional[int] = None) -> float:
+        """Calcular Maximum Drawdown (pico global, ou das últimas drawdown_lookback apostas)"""
         if len(returns) == 0:
             return 0.0
         
-        cumulative = np.cumsum(returns)
-        running_max = np.maximum.accumulate(cumulative)
-        drawdown = cumulative - running_max
-        
-        return np.min(drawdown) * 100  # Converter para percentual
+        if drawdown_lookback is not None:
+            return _windowed_min_drawdown(returns, drawdown_lookback) * 100
+        return _min_drawdown(returns) * 100  # Converter para percentual
     
     def calculate_var(self, returns: np.ndarray, confidence_level: float) -> float:
         """Calcular Value at Risk"""
         if len(returns) == 0:
             return 0.0
         
-        return np.percentile(returns, (1 - confidence_level) * 100) * 100
+        return _quantile_select(returns, 1 - confidence_level) * 100
     
     def calculate_cvar(self, returns: np.ndarray, confidence_level: float) -> float:
         """Calcular Conditional Value at Risk (Expected Shortfall)"""
         if len(returns) == 0:
             return 0.0
         
-        var_threshold = np.percentile(returns, (1 - confidence_level) * 100)
+        var_threshold = _quantile_select(returns, 1 - confidence_level)
         tail_losses = returns[returns <= var_threshold]
         
         return np.mean(tail_losses) * 100 if len(tail_losses) > 0 else 0.0
     
     def calculate_profit_factor(self) -> float:
         """Calcular Profit Factor (lucros totais / perdas totais)"""
-        if self.df_apostas is None or self.df_apostas.empty:
+        if not self._has_data:
             return 0.0
         
-        wins = self.df_apostas[self.df_apostas['lucro_prejuizo'] > 0]['lucro_prejuizo'].sum()
-        losses = abs(self.df_apostas[self.df_apostas['lucro_prejuizo'] < 0]['lucro_prejuizo'].sum())
+        # Somas sem máscaras nem cópias (fmax/fmin ignoram valores em falta)
+        wins = np.fmax(self._pl, 0.0).sum()
+        losses = -np.fmin(self._pl, 0.0).sum()
         
         return wins / losses if losses > 0 else float('inf') if wins > 0 else 0.0
     
     def calculate_kelly_criterion(self, win_rate: float, avg_win: float, avg_loss: float) -> float:
         """Calcular Kelly Criterion para otimização de stake"""
-        if avg_loss == 0:
-            return 0.0
-        
-        b = avg_win / abs(avg_loss)  # Ratio win/loss
-        p = win_rate / 100  # Probabilidade de ganhar
-        q = 1 - p  # Probabilidade de perder
-        
-        kelly = (b * p - q) / b
-        return max(0, min(kelly, 0.25))  # Limitar a 25% para segurança
+        return float(_kelly_fraction(win_rate, avg_win, avg_loss))
     
+    @_memoize_by_df
     def calculate_optimal_kelly(self) -> Dict[str, float]:
         """Calcular Kelly Criterion otimizado por diferentes critérios"""
-        if self.df_apostas is None or self.df_apostas.empty:
+        if not self._has_data:
             return {}
         
         # Kelly geral
-        win_rate = self.df_apostas['win'].mean() * 100
-        wins = self.df_apostas[self.df_apostas['lucro_prejuizo'] > 0]['lucro_prejuizo']
-        losses = self.df_apostas[self.df_apostas['lucro_prejuizo'] < 0]['lucro_prejuizo']
+        win_rate = self._win.mean() * 100
+        wins = self._pl[self._pl > 0]
+        losses = self._pl[self._pl < 0]
         
         avg_win = wins.mean() if len(wins) > 0 else 0
         avg_loss = losses.mean() if len(losses) > 0 else 0
         
         kelly_general = self.calculate_kelly_criterion(win_rate, avg_win, avg_loss)
         
-        # Kelly por competição
-        kelly_by_competition = {}
-        for comp in self.df_apostas['competicao'].unique():
-            comp_data = self.df_apostas[self.df_apostas['competicao'] == comp]
-            if len(comp_data) >= 10:  # Mínimo 10 apostas
-                comp_win_rate = comp_data['win'].mean() * 100
-                comp_wins = comp_data[comp_data['lucro_prejuizo'] > 0]['lucro_prejuizo']
-                comp_losses = comp_data[comp_data['lucro_prejuizo'] < 0]['lucro_prejuizo']
-                
-                comp_avg_win = comp_wins.mean() if len(comp_wins) > 0 else 0
-                comp_avg_loss = comp_losses.mean() if len(comp_losses) > 0 else 0
-                
-                kelly_by_competition[comp] = self.calculate_kelly_criterion(
-                    comp_win_rate, comp_avg_win, comp_avg_loss
-                )
-        
-        # Kelly por tipo de aposta
-        kelly_by_bet_type = {}
-        for bet_type in self.df_apostas['tipo_aposta'].unique():
-            type_data = self.df_apostas[self.df_apostas['tipo_aposta'] == bet_type]
-            if len(type_data) >= 10:  # Mínimo 10 apostas
-                type_win_rate = type_data['win'].mean() * 100
-                type_wins = type_data[type_data['lucro_prejuizo'] > 0]['lucro_prejuizo']
-                type_losses = type_data[type_data['lucro_prejuizo'] < 0]['lucro_prejuizo']
-                
-                type_avg_win = type_wins.mean() if len(type_wins) > 0 else 0
-                type_avg_loss = type_losses.mean() if len(type_losses) > 0 else 0
-                
-                kelly_by_bet_type[bet_type] = self.calculate_kelly_criterion(
-                    type_win_rate, type_avg_win, type_avg_loss
-                )
+        # Kelly por competição e por tipo de aposta
+        kelly_by_competition = self._kelly_by_group(self._comp_codes, self._comp_uniques)
+        kelly_by_bet_type = self._kelly_by_group(self._tipo_codes, self._tipo_uniques)
         
         return {
             'kelly_general': kelly_general,
@@ -214,12 +444,36 @@ class RiskAnalyzer:
             'kelly_by_bet_type': kelly_by_bet_type
         }
     
+    def _kelly_by_group(self, codes: np.ndarray, uniques: np.ndarray, min_bets: int = 10) -> Dict[str, float]:
+        """Kelly por grupo com somas por np.bincount (mínimo de apostas por grupo)"""
+        valid = codes >= 0
+        codes = codes[valid]
+        pl = self._pl[valid]
+        n_groups = len(uniques)
+        
+        is_win = pl > 0
+        is_loss = pl < 0
+        n = np.bincount(codes, minlength=n_groups)
+        wins = np.bincount(codes, weights=self._win[valid], minlength=n_groups)
+        win_sum = np.bincount(codes, weights=np.where(is_win, pl, 0.0), minlength=n_groups)
+        win_count = np.bincount(codes, weights=is_win, minlength=n_groups)
+        loss_sum = np.bincount(codes, weights=np.where(is_loss, pl, 0.0), minlength=n_groups)
+        loss_count = np.bincount(codes, weights=is_loss, minlength=n_groups)
+        
+        groups = np.flatnonzero(n >= min_bets)
+        avg_win = np.divide(win_sum, win_count, out=np.zeros(n_groups), where=win_count > 0)
+        avg_loss = np.divide(loss_sum, loss_count, out=np.zeros(n_groups), where=loss_count > 0)
+        kelly = _kelly_fraction(wins[groups] / n[groups] * 100, avg_win[groups], avg_loss[groups])
+        
+        return dict(zip(uniques[groups], kelly.tolist()))
+    
+    @_memoize_by_df
     def calculate_risk_adjusted_returns(self) -> Dict[str, float]:
         """Calcular retornos ajustados ao risco"""
-        if self.df_apostas is None or self.df_apostas.empty:
+        if not self._has_data:
             return {}
         
-        returns = self.df_apostas['return'].values
+        returns = self._return
         
         # Information Ratio
         benchmark_return = 0  # Assumindo benchmark de 0%
@@ -242,150 +496,139 @@ class RiskAnalyzer:
             'jensens_alpha': jensens_alpha * 100
         }
     
+    @_memoize_by_df
     def analyze_drawdown_periods(self) -> List[Dict]:
         """Analisar períodos de drawdown"""
-        if self.df_apostas is None or self.df_apostas.empty:
+        if not self._has_data:
             return []
         
-        returns = self.df_apostas['return'].values
+        returns = self._return
         dates = self.df_apostas['data_hora'].values
         
-        cumulative = np.cumsum(returns)
-        running_max = np.maximum.accumulate(cumulative)
-        drawdown = cumulative - running_max
-        
-        # Identificar períodos de drawdown
-        in_drawdown = drawdown < 0
-        drawdown_periods = []
-        
-        start_idx = None
-        for i, is_dd in enumerate(in_drawdown):
-            if is_dd and start_idx is None:
-                start_idx = i
-            elif not is_dd and start_idx is not None:
-                # Fim do período de drawdown
-                end_idx = i - 1
-                period_drawdown = drawdown[start_idx:end_idx+1]
-                max_dd_in_period = np.min(period_drawdown)
-                
-                drawdown_periods.append({
-                    'start_date': dates[start_idx],
-                    'end_date': dates[end_idx],
-                    'duration_days': pd.Timedelta(dates[end_idx] - dates[start_idx]).days,
-                    'max_drawdown': max_dd_in_period * 100,
-                    'recovery_time': None  # Será calculado se houver recuperação
-                })
-                
-                start_idx = None
+        drawdown, _ = _drawdown_and_min(returns)
         
-        # Se ainda estamos em drawdown
-        if start_idx is not None:
-            period_drawdown = drawdown[start_idx:]
-            max_dd_in_period = np.min(period_drawdown)
-            
-            drawdown_periods.append({
+        # Identificar períodos de drawdown (run-length encoding da máscara)
+        in_drawdown = np.r_[False, drawdown < 0, False].astype(np.int8)
+        edges = np.flatnonzero(np.diff(in_drawdown))
+        starts, ends = edges[0::2], edges[1::2] - 1
+        if starts.size == 0:
+            return []
+        
+        period_minima = np.minimum.reduceat(drawdown, starts)
+        durations = pd.TimedeltaIndex(dates[ends] - dates[starts]).days
+        last_idx = len(drawdown) - 1
+        
+        drawdown_periods = [
+            {
                 'start_date': dates[start_idx],
-                'end_date': dates[-1],
-                'duration_days': pd.Timedelta(dates[-1] - dates[start_idx]).days,
+                'end_date': dates[end_idx],
+                'duration_days': duration,
                 'max_drawdown': max_dd_in_period * 100,
-                'recovery_time': None,
-                'ongoing': True
-            })
+                'recovery_time': None  # Será calculado se houver recuperação
+            }
+            for start_idx, end_idx, duration, max_dd_in_period in zip(starts, ends, durations, period_minima)
+        ]
+        
+        # Se ainda estamos em drawdown
+        if ends[-1] == last_idx:
+            drawdown_periods[-1]['ongoing'] = True
         
         return drawdown_periods
     
     def calculate_risk_metrics_by_period(self, period_days: int = 30) -> pd.DataFrame:
         """Calcular métricas de risco por período"""
-        if self.df_apostas is None or self.df_apostas.empty:
+        if not self._has_data:
             return pd.DataFrame()
         
-        # Agrupar por períodos
-        self.df_apostas['period'] = self.df_apostas['data_hora'].dt.to_period(f'{period_days}D')
-        
-        period_metrics = []
+        # Janelas de period_days dias, em ordem cronológica (o drawdown depende da ordem)
+        df = self.df_apostas.dropna(subset=['data_hora']).sort_values('data_hora', kind='mergesort')
+        if df.empty:
+            return pd.DataFrame()
         
-        for period, group in self.df_apostas.groupby('period'):
-            if len(group) >= 5:  # Mínimo 5 apostas por período
-                returns = group['return'].values
-                
-                metrics = {
-                    'period': str(period),
-                    'start_date': group['data_hora'].min(),
-                    'end_date': group['data_hora'].max(),
-                    'num_bets': len(group),
-                    'win_rate': group['win'].mean() * 100,
-                    'avg_return': np.mean(returns) * 100,
-                    'volatility': np.std(returns) * 100,
-                    'sharpe_ratio': self.calculate_sharpe_ratio(returns),
-                    'max_drawdown': self.calculate_max_drawdown(returns),
-                    'var_95': self.calculate_var(returns, 0.95),
-                    'total_profit': group['lucro_prejuizo'].sum()
-                }
-                
-                period_metrics.append(metrics)
+        # Janelas fixas [início, início + period_days) a partir da meia-noite do primeiro dia
+        # com apostas. (O antigo dt.to_period(f'{n}D') criava um período por dia e, na
+        # prática, raramente chegava às 5 apostas mínimas.)
+        grouped = df.groupby(pd.Grouper(
+            key='data_hora', freq=f'{period_days}D', origin='start_day', closed='left', label='left'
+        ))
+        period_metrics = grouped.agg(
+            start_date=('data_hora', 'min'),
+            end_date=('data_hora', 'max'),
+            num_bets=('win', 'size'),
+            win_rate=('win', 'mean'),
+            avg_return=('return', 'mean'),
+            total_profit=('lucro_prejuizo', 'sum')
+        )
+        period_metrics['volatility'] = grouped['return'].std(ddof=0)
+        period_metrics['var_95'] = grouped['return'].quantile(0.05) * 100
+        
+        # As janelas são fatias contíguas dos retornos ordenados
+        sizes = period_metrics['num_bets'].to_numpy()
+        ends = np.cumsum(sizes)
+        starts = ends - sizes
+        
+        keep = sizes >= 5  # Mínimo 5 apostas por período
+        returns = df['return'].to_numpy(dtype=np.float64)
+        period_metrics = period_metrics[keep]
+        if period_metrics.empty:
+            return pd.DataFrame()
         
-        return pd.DataFrame(period_metrics)
+        period_metrics['max_drawdown'] = [
+            _min_drawdown(returns[start:end]) * 100 for start, end in zip(starts[keep], ends[keep])
+        ]
+        
+        avg_return = period_metrics['avg_return'].to_numpy()
+        volatility = period_metrics['volatility'].to_numpy()
+        period_metrics['sharpe_ratio'] = np.divide(
+            avg_return, volatility, out=np.zeros_like(avg_return), where=volatility > 0
+        )
+        period_metrics['win_rate'] *= 100
+        period_metrics['avg_return'] *= 100
+        period_metrics['volatility'] *= 100
+        period_metrics['period'] = period_metrics.index.astype(str)
+        
+        return period_metrics.reset_index(drop=True)[[
+            'period', 'start_date', 'end_date', 'num_bets', 'win_rate', 'avg_return',
+            'volatility', 'sharpe_ratio', 'max_drawdown', 'var_95', 'total_profit'
+        ]]
     
     def monte_carlo_simulation(self, num_simulations: int = 1000, num_bets: int = 100) -> Dict:
         """Simulação Monte Carlo para projeção de resultados"""
-        if self.df_apostas is None or self.df_apostas.empty:
+        if not self._has_data:
             return {}
         
         # Parâmetros históricos
-        win_rate = self.df_apostas['win'].mean()
-        avg_win = self.df_apostas[self.df_apostas['lucro_prejuizo'] > 0]['return'].mean()
-        avg_loss = self.df_apostas[self.df_apostas['lucro_prejuizo'] < 0]['return'].mean()
+        win_rate = self._win.mean()
+        avg_win = np.nanmean(self._return[self._pl > 0]) if (self._pl > 0).any() else 0
+        avg_loss = np.nanmean(self._return[self._pl < 0]) if (self._pl < 0).any() else 0
         
         if pd.isna(avg_win):
             avg_win = 0
         if pd.isna(avg_loss):
             avg_loss = 0
         
-        simulation_results = []
-        
-        for _ in range(num_simulations):
-            cumulative_return = 0
-            max_drawdown = 0
-            current_drawdown = 0
-            peak = 0
-            
-            for _ in range(num_bets):
-                # Simular resultado da aposta
-                if np.random.random() < win_rate:
-                    bet_return = avg_win
-                else:
-                    bet_return = avg_loss
-                
-                cumulative_return += bet_return
-                
-                # Calcular drawdown
-                if cumulative_return > peak:
-                    peak = cumulative_return
-                    current_drawdown = 0
-                else:
-                    current_drawdown = peak - cumulative_return
-                    max_drawdown = max(max_drawdown, current_drawdown)
-            
-            simulation_results.append({
-                'final_return': cumulative_return * 100,
-                'max_drawdown': max_drawdown * 100
-            })
+        # Sorteio de todas as apostas num único bloco; o resultado é uma escolha sem ramos
+        draws = np.random.default_rng().random((num_simulations, num_bets))
+        outcomes = np.where(draws < win_rate, float(avg_win), float(avg_loss))
+        final_returns, max_drawdowns = _mc_kernel(outcomes)
         
-        results_df = pd.DataFrame(simulation_results)
+        final_returns *= 100
+        max_drawdowns *= 100
+        p5, p25, p50, p75, p95 = np.quantile(final_returns, [0.05, 0.25, 0.50, 0.75, 0.95])
         
         return {
-            'mean_return': results_df['final_return'].mean(),
-            'std_return': results_df['final_return'].std(),
-            'percentile_5': results_df['final_return'].quantile(0.05),
-            'percentile_25': results_df['final_return'].quantile(0.25),
-            'percentile_50': results_df['final_return'].quantile(0.50),
-            'percentile_75': results_df['final_return'].quantile(0.75),
-            'percentile_95': results_df['final_return'].quantile(0.95),
-            'prob_profit': (results_df['final_return'] > 0).mean() * 100,
-            'prob_loss_10': (results_df['final_return'] < -10).mean() * 100,
-            'prob_loss_20': (results_df['final_return'] < -20).mean() * 100,
-            'avg_max_drawdown': results_df['max_drawdown'].mean(),
-            'worst_drawdown': results_df['max_drawdown'].max()
+            'mean_return': final_returns.mean(),
+            'std_return': final_returns.std(ddof=1),
+            'percentile_5': p5,
+            'percentile_25': p25,
+            'percentile_50': p50,
+            'percentile_75': p75,
+            'percentile_95': p95,
+            'prob_profit': (final_returns > 0).mean() * 100,
+            'prob_loss_10': (final_returns < -10).mean() * 100,
+            'prob_loss_20': (final_returns < -20).mean() * 100,
+            'avg_max_drawdown': max_drawdowns.mean(),
+            'worst_drawdown': max_drawdowns.max()
         }
     
     def calculate_position_sizing(self, bankroll: float, risk_level: str = 'moderate') -> Dict:
@@ -409,8 +652,8 @@ class RiskAnalyzer:
             'fixed_amount': bankroll * 0.02,  # 2% fixo
             'fixed_percentage': bankroll * 0.05,  # 5% fixo
             'kelly_criterion': bankroll * adjusted_kelly,
-            'volatility_adjusted': bankroll * (0.02 / max(0.01, self.df_apostas['return'].std())),
-            'confidence_based': bankroll * 0.01 * (self.df_apostas['win'].mean() * 10)
+            'volatility_adjusted': bankroll * (0.02 / max(0.01, np.nanstd(self._return, ddof=1))),
+            'confidence_based': bankroll * 0.01 * (self._win.mean() * 10)
         }
         
         # Limites de segurança
@@ -429,7 +672,7 @@ class RiskAnalyzer:
     
     def generate_risk_report(self) -> Dict:
         """Gerar relatório completo de risco"""
-        if self.df_apostas is None or self.df_apostas.empty:
+        if not self._has_data:
             return {'error': 'Dados insuficientes para análise de risco'}
         
         basic_metrics = self.calculate_basic_metrics()
@@ -503,40 +746,8 @@ class RiskAnalyzer:
     
     def get_risk_recommendations(self, risk_score: float) -> List[str]:
         """Obter recomendações baseadas no nível de risco"""
-        recommendations = []
-        
-        if risk_score > 80:
-            recommendations.extend([
-                "⚠️ Risco muito alto detectado",
-                "Reduza significativamente o tamanho das apostas",
-                "Revise sua estratégia de apostas",
-                "Considere fazer uma pausa para análise",
-                "Implemente stop-loss rigoroso"
-            ])
-        elif risk_score > 60:
-            recommendations.extend([
-                "⚡ Risco elevado",
-                "Reduza o tamanho das apostas",
-                "Diversifique mais suas apostas",
-                "Monitore o drawdown de perto",
-                "Considere estratégias mais conservadoras"
-            ])
-        elif risk_score > 40:
-            recommendations.extend([
-                "📊 Risco moderado",
-                "Mantenha disciplina na gestão de banca",
-                "Continue monitorando as métricas",
-                "Considere otimizar com Kelly Criterion"
-            ])
-        else:
-            recommendations.extend([
-                "✅ Risco controlado",
-                "Continue com a estratégia atual",
-                "Monitore regularmente as métricas",
-                "Considere aumentar gradualmente as posições"
-            ])
-        
-        return recommendations
+        level = bisect.bisect_left(self._RISK_THRESHOLDS, risk_score)
+        return list(self._RISK_RECOMMENDATIONS[level])
 
 # Funções utilitárias para cálculos específicos
 def calculate_implied_probability(odd: float) -> float:
@@ -12,12 +12,73 @@ import secrets
 import hashlib
 import json
 import os
-from datetime import datetime, timedelta
+import atexit
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
 from typing import Dict, Optional, Tuple
 import customtkinter as ctk
-from tkinter import messagebox
+from tkinter import messagebox, TclError
 from usuarios import GestorUtilizadores, TipoUtilizador
 
+# Instruções SQL do fluxo de autenticação: texto fixo, para o cache de instruções
+# preparadas da ligação (indexado pelo texto) as reutilizar sem novo parsing
+SQL_SELECT_USER = """
+    SELECT id, ativo, bloqueado_ate_ts, tentativas_login, password_hash, salt
+    FROM utilizadores
+    WHERE username = ?
+"""
+SQL_SELECT_ESTADO_USER = "SELECT ativo, bloqueado_ate_ts FROM utilizadores WHERE id = ?"
+SQL_SELECT_PERFIL = "SELECT username, email, tipo_utilizador FROM utilizadores WHERE id = ?"
+SQL_DESBLOQUEAR_USER = "UPDATE utilizadores SET bloqueado_ate = NULL, bloqueado_ate_ts = NULL, tentativas_login = 0 WHERE id = ?"
+SQL_UPDATE_PASSWORD = "UPDATE utilizadores SET password_hash = ?, salt = ? WHERE id = ? AND password_hash = ?"
+SQL_REGISTAR_FALHA = """
+    UPDATE utilizadores
+    SET tentativas_login = tentativas_login + 1,
+        bloqueado_ate_ts = CASE WHEN tentativas_login + 1 >= ? THEN ? ELSE bloqueado_ate_ts END
+    WHERE id = ?
+    RETURNING tentativas_login
+"""
+SQL_LOGIN_SUCESSO = "UPDATE utilizadores SET tentativas_login = 0, ultimo_login = CURRENT_TIMESTAMP WHERE id = ?"
+SQL_INSERT_SESSAO = """
+    INSERT INTO sessoes
+    (utilizador_id, token_sessao, data_expiracao_ts, ip_address, user_agent)
+    VALUES (?, ?, ?, ?, ?)
+"""
+SQL_UPDATE_LOGOUT = "UPDATE sessoes SET ativo = 0 WHERE token_sessao = ?"
+SQL_SELECT_SESSAO = """
+    SELECT s.utilizador_id, s.data_expiracao_ts, u.username, u.email, u.tipo_utilizador
+    FROM sessoes s
+    JOIN utilizadores u ON s.utilizador_id = u.id
+    WHERE s.token_sessao = ? AND s.ativo = 1 AND u.ativo = 1
+"""
+SQL_LIMPAR_SESSOES = """
+    DELETE FROM sessoes
+    WHERE ativo = 0 OR data_expiracao_ts IS NULL OR data_expiracao_ts < ?
+"""
+SQL_LISTAR_SESSOES = """
+    SELECT s.id, u.username, s.data_inicio, s.data_expiracao_ts,
+           s.ip_address, s.user_agent
+    FROM sessoes s
+    JOIN utilizadores u ON s.utilizador_id = u.id
+    WHERE s.ativo = 1 AND s.data_expiracao_ts > ?
+    ORDER BY s.data_inicio DESC
+"""
+
+# Gestores ainda vivos; um único hook no fim do processo fecha (e otimiza) as suas ligações
+_gestores_ativos = weakref.WeakSet()
+
+def _fechar_gestores():
+    """Fecha as ligações dos gestores que ainda existam no fim do processo"""
+    for gestor in list(_gestores_ativos):
+        gestor.close()
+
+atexit.register(_fechar_gestores)
+
 class SessaoUtilizador:
     """Classe para gestão de sessões de utilizador"""
     
@@ -51,92 +112,147 @@ class GestorAutenticacao:
         self.sessao_atual = SessaoUtilizador()
         self.max_tentativas_login = 5
         self.tempo_bloqueio_minutos = 30
+        
+        # Ligação única, partilhada entre chamadas (callbacks Tk podem intercalar-se)
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        
+        # Cache LRU de sessões validadas: token -> (validade monotónica, utilizador, permissões)
+        self.cache_sessoes_ttl = 30
+        self.cache_sessoes_max = 1024
+        self._cache_sessoes = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # Limpeza de sessões inativas/expiradas: em ~1/256 dos logins (nunca na construção,
+        # para que importar o módulo não escreva na base de dados)
+        self.prob_limpeza_sessoes = 1 / 256
+        
+        # Referência fraca: o fecho no fim do processo não mantém o gestor vivo
+        _gestores_ativos.add(self)
+    
+    def _get_conn(self) -> sqlite3.Connection:
+        """Ligação SQLite reutilizada, criada na primeira utilização"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                PRAGMA busy_timeout=5000;
+                PRAGMA temp_store=MEMORY;
+                PRAGMA cache_size=-20000;
+                PRAGMA foreign_keys=ON;
+            """)
+        return self._conn
+    
+    def close(self):
+        """Fechar a ligação persistente, atualizando antes as estatísticas do planeador"""
+        with self._conn_lock:
+            if self._conn is not None:
+                try:
+                    self._conn.execute("PRAGMA optimize")
+                finally:
+                    self._conn.close()
+                    self._conn = None
+    
+    def _vacuum_sessoes(self) -> int:
+        """Elimina sessões inativas ou expiradas numa única instrução"""
+        try:
+            with self._conn_lock:
+                return self._get_conn().execute(SQL_LIMPAR_SESSOES, (int(time.time()),)).rowcount
+        except sqlite3.Error as e:
+            print(f"Erro ao limpar sessões: {e}")
+            return 0
+    
+    @contextmanager
+    def _transacao(self):
+        """Transação única (BEGIN IMMEDIATE) na ligação partilhada: commit no fim, rollback em erro"""
+        with self._conn_lock:
+            conn = self._get_conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn.cursor()
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
     
     def autenticar_utilizador(self, username: str, password: str, 
                              ip_address: str = "localhost", 
                              user_agent: str = "Desktop App") -> Tuple[bool, str]:
         """Autentica utilizador no sistema"""
         try:
-            # Verificar se utilizador existe
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT id, username, email, password_hash, salt, tipo_utilizador, 
-                       ativo, tentativas_login, bloqueado_ate
-                FROM utilizadores 
-                WHERE username = ?
-            """, (username,))
-            
-            utilizador = cursor.fetchone()
+            # Verificar se utilizador existe (leitura simples, sem transação)
+            with self._conn_lock:
+                utilizador = self._get_conn().execute(SQL_SELECT_USER, (username,)).fetchone()
             
             if not utilizador:
-                conn.close()
                 return False, "Utilizador não encontrado"
             
-            utilizador_id, username, email, password_hash, salt, tipo_utilizador, \
-            ativo, tentativas_login, bloqueado_ate = utilizador
+            utilizador_id, ativo, bloqueado_ate_ts, _, password_hash, salt = utilizador
             
             # Verificar se utilizador está ativo
             if not ativo:
-                conn.close()
                 return False, "Conta desativada"
             
             # Verificar se utilizador está bloqueado
-            if bloqueado_ate:
-                bloqueio_dt = datetime.fromisoformat(bloqueado_ate)
-                if datetime.now() < bloqueio_dt:
-                    conn.close()
-                    return False, f"Conta bloqueada até {bloqueio_dt.strftime('%H:%M:%S')}"
-                else:
+            mensagem_bloqueio = self._mensagem_bloqueio(bloqueado_ate_ts)
+            if mensagem_bloqueio:
+                return False, mensagem_bloqueio
+            
+            # Verificar password (KDF lento) fora de qualquer transação e sem o lock da ligação
+            password_ok = self.gestor_utilizadores.verificar_password(password, password_hash, salt)
+            novo_hash = None
+            if password_ok and self.gestor_utilizadores.precisa_rehash(password, password_hash):
+                novo_hash, novo_salt = self.gestor_utilizadores.gerar_hash_password(password)
+            
+            # Transação curta apenas para o registo do resultado
+            with self._transacao() as cursor:
+                # Reconfirmar estado: outro login pode ter bloqueado a conta entretanto
+                cursor.execute(SQL_SELECT_ESTADO_USER, (utilizador_id,))
+                estado = cursor.fetchone()
+                if not estado:
+                    return False, "Utilizador não encontrado"
+                
+                ativo, bloqueado_ate_ts = estado
+                if not ativo:
+                    return False, "Conta desativada"
+                
+                mensagem_bloqueio = self._mensagem_bloqueio(bloqueado_ate_ts)
+                if mensagem_bloqueio:
+                    return False, mensagem_bloqueio
+                
+                if bloqueado_ate_ts is not None:
                     # Remover bloqueio expirado
-                    cursor.execute("""
-                        UPDATE utilizadores 
-                        SET bloqueado_ate = NULL, tentativas_login = 0
-                        WHERE id = ?
-                    """, (utilizador_id,))
-                    tentativas_login = 0
-            
-            # Verificar password
-            if not self.gestor_utilizadores.verificar_password(password, password_hash, salt):
-                # Incrementar tentativas de login
-                tentativas_login += 1
+                    cursor.execute(SQL_DESBLOQUEAR_USER, (utilizador_id,))
                 
-                if tentativas_login >= self.max_tentativas_login:
-                    # Bloquear conta
-                    bloqueio_ate = datetime.now() + timedelta(minutes=self.tempo_bloqueio_minutos)
-                    cursor.execute("""
-                        UPDATE utilizadores 
-                        SET tentativas_login = ?, bloqueado_ate = ?
-                        WHERE id = ?
-                    """, (tentativas_login, bloqueio_ate.isoformat(), utilizador_id))
+                if not password_ok:
+                    # Incrementar tentativas (e bloquear ao atingir o limite) numa só instrução
+                    bloqueio_ate_ts = int(time.time()) + self.tempo_bloqueio_minutos * 60
+                    cursor.execute(SQL_REGISTAR_FALHA, (self.max_tentativas_login, bloqueio_ate_ts, utilizador_id))
+                    tentativas_login = cursor.fetchone()[0]
                     
-                    conn.commit()
-                    conn.close()
-                    return False, f"Muitas tentativas falhadas. Conta bloqueada por {self.tempo_bloqueio_minutos} minutos"
-                else:
-                    cursor.execute("""
-                        UPDATE utilizadores 
-                        SET tentativas_login = ?
-                        WHERE id = ?
-                    """, (tentativas_login, utilizador_id))
-                    
-                    conn.commit()
-                    conn.close()
-                    return False, f"Password incorreta. Tentativas restantes: {self.max_tentativas_login - tentativas_login}"
-            
-            # Login bem-sucedido
-            # Resetar tentativas de login
-            cursor.execute("""
-                UPDATE utilizadores 
-                SET tentativas_login = 0, ultimo_login = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (utilizador_id,))
-            
-            # Criar sessão
-            token_sessao = self._criar_sessao(cursor, utilizador_id, ip_address, user_agent)
+                    if tentativas_login >= self.max_tentativas_login:
+                        return False, f"Muitas tentativas falhadas. Conta bloqueada por {self.tempo_bloqueio_minutos} minutos"
+                    else:
+                        return False, f"Password incorreta. Tentativas restantes: {self.max_tentativas_login - tentativas_login}"
+                
+                # Login bem-sucedido
+                # Migrar hash legado para bcrypt (só se a password não mudou entretanto)
+                if novo_hash:
+                    cursor.execute(SQL_UPDATE_PASSWORD, (novo_hash, novo_salt, utilizador_id, password_hash))
+                
+                # Resetar tentativas de login
+                cursor.execute(SQL_LOGIN_SUCESSO, (utilizador_id,))
+                
+                # Criar sessão
+                token_sessao = self._criar_sessao(cursor, utilizador_id, ip_address, user_agent)
+                
+                # Dados de perfil só depois da password validada
+                cursor.execute(SQL_SELECT_PERFIL, (utilizador_id,))
+                username, email, tipo_utilizador = cursor.fetchone()
             
-            # Carregar permissões
+            # Carregar permissões (já fora da transação de escrita)
             permissoes = self.gestor_utilizadores.obter_permissoes_utilizador(utilizador_id)
             
             # Configurar sessão atual
@@ -150,25 +266,28 @@ class GestorAutenticacao:
             self.sessao_atual.data_inicio = datetime.now()
             self.sessao_atual.permissoes = permissoes
             
-            conn.commit()
-            conn.close()
+            if random.random() < self.prob_limpeza_sessoes:
+                self._vacuum_sessoes()
             
             return True, "Login realizado com sucesso"
             
         except Exception as e:
             return False, f"Erro no login: {str(e)}"
     
+    def _mensagem_bloqueio(self, bloqueado_ate_ts: Optional[int]) -> Optional[str]:
+        """Mensagem de conta bloqueada, ou None se não houver bloqueio em vigor"""
+        if bloqueado_ate_ts is not None and time.time() < bloqueado_ate_ts:
+            bloqueio_dt = datetime.fromtimestamp(bloqueado_ate_ts)
+            return f"Conta bloqueada até {bloqueio_dt.strftime('%H:%M:%S')}"
+        return None
+    
     def _criar_sessao(self, cursor, utilizador_id: int, ip_address: str, 
                      user_agent: str) -> str:
         """Cria nova sessão para o utilizador"""
         token_sessao = secrets.token_urlsafe(32)
-        data_expiracao = datetime.now() + timedelta(hours=8)  # Sessão expira em 8 horas
+        data_expiracao_ts = int(time.time()) + 8 * 3600  # Sessão expira em 8 horas
         
-        cursor.execute("""
-            INSERT INTO sessoes 
-            (utilizador_id, token_sessao, data_expiracao, ip_address, user_agent)
-            VALUES (?, ?, ?, ?, ?)
-        """, (utilizador_id, token_sessao, data_expiracao.isoformat(), 
+        cursor.execute(SQL_INSERT_SESSAO, (utilizador_id, token_sessao, data_expiracao_ts, 
               ip_address, user_agent))
         
         return token_sessao
@@ -177,17 +296,16 @@ class GestorAutenticacao:
         """Termina sessão do utilizador"""
         try:
             if self.sessao_atual.token_sessao:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
+                with self._cache_lock:
+                    self._cache_sessoes.pop(self.sessao_atual.token_sessao, None)
                 
-                cursor.execute("""
-                    UPDATE sessoes 
-                    SET ativo = 0
-                    WHERE token_sessao = ?
-                """, (self.sessao_atual.token_sessao,))
-                
-                conn.commit()
-                conn.close()
+                with self._conn_lock:
+                    conn = self._get_conn()
+                    cursor = conn.cursor()
+                    
+                    cursor.execute(SQL_UPDATE_LOGOUT, (self.sessao_atual.token_sessao,))
+                    
+                    conn.commit()
             
             self.sessao_atual.limpar_sessao()
             return True
@@ -198,48 +316,62 @@ class GestorAutenticacao:
     
     def validar_sessao(self, token_sessao: str) -> bool:
         """Valida se sessão ainda é válida"""
+        agora = time.monotonic()
+        with self._cache_lock:
+            entrada = self._cache_sessoes.get(token_sessao)
+            if entrada is not None:
+                if agora < entrada[0]:
+                    self._cache_sessoes.move_to_end(token_sessao)
+                else:
+                    del self._cache_sessoes[token_sessao]
+                    entrada = None
+        
+        if entrada is not None:
+            _, utilizador_atual, permissoes = entrada
+            self.sessao_atual.utilizador_atual = dict(utilizador_atual)
+            self.sessao_atual.token_sessao = token_sessao
+            self.sessao_atual.permissoes = list(permissoes)
+            return True
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT s.utilizador_id, s.data_expiracao, u.username, u.email, u.tipo_utilizador
-                FROM sessoes s
-                JOIN utilizadores u ON s.utilizador_id = u.id
-                WHERE s.token_sessao = ? AND s.ativo = 1 AND u.ativo = 1
-            """, (token_sessao,))
-            
-            resultado = cursor.fetchone()
-            
-            if not resultado:
-                conn.close()
-                return False
-            
-            utilizador_id, data_expiracao, username, email, tipo_utilizador = resultado
-            
-            # Verificar se sessão expirou
-            if datetime.now() > datetime.fromisoformat(data_expiracao):
-                # Desativar sessão expirada
-                cursor.execute("""
-                    UPDATE sessoes SET ativo = 0 WHERE token_sessao = ?
-                """, (token_sessao,))
-                conn.commit()
-                conn.close()
-                return False
+            with self._transacao() as cursor:
+                cursor.execute(SQL_SELECT_SESSAO, (token_sessao,))
+                
+                resultado = cursor.fetchone()
+                
+                if not resultado:
+                    return False
+                
+                utilizador_id, data_expiracao_ts, username, email, tipo_utilizador = resultado
+                
+                # Verificar se sessão expirou
+                restante = (data_expiracao_ts or 0) - time.time()
+                if restante < 0:
+                    # Desativar sessão expirada
+                    cursor.execute(SQL_UPDATE_LOGOUT, (token_sessao,))
+                    return False
             
             # Recarregar dados da sessão
             permissoes = self.gestor_utilizadores.obter_permissoes_utilizador(utilizador_id)
             
-            self.sessao_atual.utilizador_atual = {
+            utilizador_atual = {
                 'id': utilizador_id,
                 'username': username,
                 'email': email,
                 'tipo_utilizador': tipo_utilizador
             }
+            self.sessao_atual.utilizador_atual = dict(utilizador_atual)
             self.sessao_atual.token_sessao = token_sessao
-            self.sessao_atual.permissoes = permissoes
+            self.sessao_atual.permissoes = list(permissoes)
+            
+            # Guardar em cache, nunca para além da expiração da sessão
+            validade = agora + min(self.cache_sessoes_ttl, restante)
+            with self._cache_lock:
+                self._cache_sessoes[token_sessao] = (validade, utilizador_atual, permissoes)
+                self._cache_sessoes.move_to_end(token_sessao)
+                if len(self._cache_sessoes) > self.cache_sessoes_max:
+                    self._cache_sessoes.popitem(last=False)
             
-            conn.close()
             return True
             
         except Exception as e:
@@ -257,20 +389,12 @@ class GestorAutenticacao:
     def listar_sessoes_ativas(self) -> list:
         """Lista todas as sessões ativas"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT s.id, u.username, s.data_inicio, s.data_expiracao, 
-                       s.ip_address, s.user_agent
-                FROM sessoes s
-                JOIN utilizadores u ON s.utilizador_id = u.id
-                WHERE s.ativo = 1 AND s.data_expiracao > CURRENT_TIMESTAMP
-                ORDER BY s.data_inicio DESC
-            """)
-            
-            resultados = cursor.fetchall()
-            conn.close()
+            with self._conn_lock:
+                cursor = self._get_conn().cursor()
+                
+                cursor.execute(SQL_LISTAR_SESSOES, (int(time.time()),))
+                
+                resultados = cursor.fetchall()
             
             sessoes = []
             for resultado in resultados:
@@ -278,7 +402,7 @@ class GestorAutenticacao:
                     'id': resultado[0],
                     'username': resultado[1],
                     'data_inicio': resultado[2],
-                    'data_expiracao': resultado[3],
+                    'data_expiracao': datetime.fromtimestamp(resultado[3]).isoformat(),
                     'ip_address': resultado[4],
                     'user_agent': resultado[5]
                 })
@@ -398,6 +522,10 @@ class JanelaLogin(ctk.CTkToplevel):
     
     def fazer_login(self):
         """Processa tentativa de login"""
+        # Ignorar <Return> enquanto um login está em curso
+        if self.btn_login.cget("state") == "disabled":
+            return
+        
         username = self.entry_username.get().strip()
         password = self.entry_password.get()
         
@@ -407,10 +535,23 @@ class JanelaLogin(ctk.CTkToplevel):
         
         # Desabilitar botão durante login
         self.btn_login.configure(state="disabled", text="Entrando...")
-        self.update()
         
-        # Tentar autenticar
+        # Autenticar fora da thread da interface (o hash da password é propositadamente lento)
+        threading.Thread(target=self._auth_worker, args=(username, password), daemon=True).start()
+    
+    def _auth_worker(self, username: str, password: str):
+        """Executa a autenticação numa thread de trabalho"""
         sucesso, mensagem = self.gestor_auth.autenticar_utilizador(username, password)
+        try:
+            self.after(0, self._finish_login, sucesso, mensagem)
+        except (RuntimeError, TclError):
+            # Janela fechada entretanto
+            pass
+    
+    def _finish_login(self, sucesso: bool, mensagem: str):
+        """Conclui o login na thread da interface"""
+        if not self.winfo_exists():
+            return
         
         if sucesso:
             # Reabilitar botão antes de mostrar mensagem de sucesso
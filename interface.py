@@ -897,6 +897,10 @@ class ApostasApp:
             # Guardar na base de dados
             aposta_id = self.db.adicionar_aposta(aposta)
             
+            # Forçar nova verificação dos alertas
+            if "alertas" in self.pages:
+                self.pages["alertas"].alert_system.invalidate_cache()
+            
             # Atualizar interface
             self.update_saldo_display()
             self.update_dashboard()
@@ -930,9 +934,14 @@ class ApostasApp:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_file = backup_dir / f"apostas_backup_{timestamp}.db"
             
-            # Copiar base de dados
-            import shutil
-            shutil.copy2("apostas.db", backup_file)
+            # Copiar base de dados com a API de backup do SQLite (inclui páginas ainda no ficheiro WAL)
+            src = sqlite3.connect(self.db.db_path)
+            dst = sqlite3.connect(str(backup_file))
+            try:
+                src.backup(dst, pages=1024)
+            finally:
+                dst.close()
+                src.close()
             
             messagebox.showinfo("Backup", f"Backup criado com sucesso:\n{backup_file}")
             
@@ -13,6 +13,7 @@ import json
 import hashlib
 import secrets
 import sqlite3
+import tempfile
 from typing import Optional, Dict, Any, Union
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
@@ -220,9 +221,13 @@ class GestorSeguranca:
     def criar_backup_seguro(self, caminho_backup: str) -> str:
         """Cria backup criptografado da base de dados."""
         try:
-            # Ler base de dados
-            with open(self.db_path, 'rb') as f:
-                dados_db = f.read()
+            # Ler base de dados a partir de um instantâneo consistente (o ficheiro .db
+            # sozinho não inclui as transações ainda no ficheiro WAL)
+            with tempfile.TemporaryDirectory() as pasta_tmp:
+                instantaneo = os.path.join(pasta_tmp, "instantaneo.db")
+                self._copiar_base_dados(self.db_path, instantaneo)
+                with open(instantaneo, 'rb') as f:
+                    dados_db = f.read()
             
             # Criptografar dados
             dados_criptografados = self.fernet.encrypt(dados_db)
@@ -252,6 +257,16 @@ class GestorSeguranca:
             self.logger.error(f"Erro ao criar backup seguro: {e}")
             raise
     
+    def _copiar_base_dados(self, origem: str, destino: str):
+        """Copia uma base de dados SQLite com a API de backup (consistente mesmo em modo WAL)."""
+        src = sqlite3.connect(origem)
+        dst = sqlite3.connect(destino)
+        try:
+            src.backup(dst, pages=1024)
+        finally:
+            dst.close()
+            src.close()
+    
     def restaurar_backup_seguro(self, caminho_backup: str) -> bool:
         """Restaura backup criptografado da base de dados."""
         try:
@@ -270,11 +285,15 @@ class GestorSeguranca:
             # Criar backup da DB atual
             if os.path.exists(self.db_path):
                 backup_atual = f"{self.db_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                os.rename(self.db_path, backup_atual)
-            
-            # Restaurar base de dados
-            with open(self.db_path, 'wb') as f:
-                f.write(dados_descriptografados)
+                self._copiar_base_dados(self.db_path, backup_atual)
+            
+            # Restaurar base de dados através do SQLite, para não deixar um WAL antigo
+            # a ser reaplicado sobre o ficheiro restaurado
+            with tempfile.TemporaryDirectory() as pasta_tmp:
+                restaurado = os.path.join(pasta_tmp, "restaurado.db")
+                with open(restaurado, 'wb') as f:
+                    f.write(dados_descriptografados)
+                self._copiar_base_dados(restaurado, self.db_path)
             
             self.logger.info(f"Backup restaurado com sucesso: {backup_path}")
             return True
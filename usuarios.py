@@ -9,6 +9,7 @@ Data: 2025
 
 import sqlite3
 import hashlib
+import hmac
 import json
 import os
 from datetime import datetime
@@ -23,6 +24,16 @@ except ImportError:
     EMAIL_DISPONIVEL = False
     print("⚠️ Sistema de notificações por email não disponível")
 
+# bcrypt é opcional: sem ele mantém-se o PBKDF2 com salt separado
+try:
+    import bcrypt
+    BCRYPT_DISPONIVEL = True
+except ImportError:
+    BCRYPT_DISPONIVEL = False
+
+BCRYPT_CUSTO = 12
+BCRYPT_MAX_BYTES = 72  # bcrypt só considera os primeiros 72 bytes
+
 class TipoUtilizador(Enum):
     """Tipos de utilizador do sistema"""
     ADMIN = "admin"
@@ -120,6 +131,28 @@ class GestorUtilizadores:
             )
         """)
         
+        # Instantes de bloqueio/expiração em epoch inteiro (colunas ISO antigas ficam só como legado)
+        cursor.execute("PRAGMA table_info(utilizadores)")
+        if 'bloqueado_ate_ts' not in [coluna[1] for coluna in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE utilizadores ADD COLUMN bloqueado_ate_ts INTEGER")
+            cursor.execute("""
+                UPDATE utilizadores
+                SET bloqueado_ate_ts = CAST(strftime('%s', bloqueado_ate, 'utc') AS INTEGER)
+                WHERE bloqueado_ate IS NOT NULL
+            """)
+        
+        cursor.execute("PRAGMA table_info(sessoes)")
+        if 'data_expiracao_ts' not in [coluna[1] for coluna in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE sessoes ADD COLUMN data_expiracao_ts INTEGER")
+            cursor.execute("""
+                UPDATE sessoes
+                SET data_expiracao_ts = CAST(strftime('%s', data_expiracao, 'utc') AS INTEGER)
+                WHERE data_expiracao IS NOT NULL
+            """)
+        
+        # Índice para a validação/limpeza de sessões (username e token_sessao já são UNIQUE)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessoes_ativo_exp ON sessoes(ativo, data_expiracao_ts)")
+        
         conn.commit()
         conn.close()
     
@@ -133,9 +166,17 @@ class GestorUtilizadores:
                 tipo_utilizador=TipoUtilizador.ADMIN
             )
     
+    def _usar_bcrypt(self, password: str) -> bool:
+        """Indica se a password pode ser guardada com bcrypt"""
+        return BCRYPT_DISPONIVEL and len(password.encode('utf-8')) <= BCRYPT_MAX_BYTES
+    
     def gerar_hash_password(self, password: str, salt: str = None) -> Tuple[str, str]:
         """Gera hash seguro da password"""
         if salt is None:
+            if self._usar_bcrypt(password):
+                # O salt fica embutido no hash bcrypt; a coluna salt fica vazia
+                password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(BCRYPT_CUSTO))
+                return password_hash.decode('ascii'), ""
             salt = os.urandom(32).hex()
         
         password_hash = hashlib.pbkdf2_hmac(
@@ -149,8 +190,19 @@ class GestorUtilizadores:
     
     def verificar_password(self, password: str, password_hash: str, salt: str) -> bool:
         """Verifica se a password está correta"""
+        if password_hash.startswith("$2"):
+            # Sem bcrypt, ou acima de 72 bytes (o bcrypt 5 rejeita com ValueError), nunca coincide
+            if not self._usar_bcrypt(password):
+                return False
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('ascii'))
+        
+        # Hash PBKDF2 legado (comparação em tempo constante)
         hash_verificacao, _ = self.gerar_hash_password(password, salt)
-        return hash_verificacao == password_hash
+        return hmac.compare_digest(hash_verificacao.encode('utf-8'), password_hash.encode('utf-8'))
+    
+    def precisa_rehash(self, password: str, password_hash: str) -> bool:
+        """Indica se um hash legado (PBKDF2) deve ser migrado para bcrypt"""
+        return not password_hash.startswith("$2") and self._usar_bcrypt(password)
     
     def criar_utilizador(self, username: str, email: str, password: str, 
                         tipo_utilizador: TipoUtilizador) -> bool: